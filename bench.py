@@ -0,0 +1,299 @@
+import pymend
+from pymend import LineLexer, lex_file, interpret, import_mend_file, MendFuncArg, Scope, TT
+from contextlib import redirect_stdout
+from pathlib import Path
+from time import perf_counter
+import tempfile
+import tracemalloc
+import argparse
+import json
+import io
+import sys
+from typing import Any
+
+
+
+def generate_source(lines: int) -> str:
+    sample = [
+        '-- generated benchmark file',
+        'mut counter_{i} as {i}',
+        'immut label_{i} as "label number {i}"',
+        'mut items_{i} as [1, 2.5, "three", [4, 5]]',
+        'func helper_{i}(a, b) @builtin',
+        '    log a',
+        'end',
+        'helper_{i}(counter_{i}, label_{i})?',
+        '',
+    ]
+    out = []
+    i = 0
+    while len(out) < lines:
+        out.extend([l.format(i=i) for l in sample])
+        i += 1
+    return '\n'.join(out[:lines])
+
+
+def generate_declarations(count: int) -> str:
+    return '\n'.join([f'mut var_{i} as {i}\nimmut const_{i} as "value {i}"\nset var_{i} as const_{i}' for i in range(count)])
+
+
+def generate_nested_repeat(depth: int, amount: int) -> str:
+    lines = ['mut counter as 0']
+    for d in range(depth): lines.append('    ' * d + f'repeat {amount}')
+    lines.append('    ' * depth + 'set counter as 1')
+    for d in reversed(range(depth)): lines.append('    ' * d + 'end')
+    return '\n'.join(lines)
+
+
+def generate_calls(calls: int) -> str:
+    return '\n'.join([
+        'func work(a, b)',
+        '    mut c as a',
+        '    set c as b',
+        '    return c',
+        'end',
+        'mut x as 1',
+        f'repeat {calls}',
+        '    work(x, "y")',
+        'end',
+    ])
+
+
+def generate_lists(lines: int, width: int) -> str:
+    items = ', '.join([str(i) if i % 3 else f'"item {i}"' for i in range(width)])
+    return '\n'.join([f'immut list_{i} as [{items}, [1, 2, [3]]]' for i in range(lines)])
+
+
+def generate_number_lists(lines: int, width: int) -> str:
+    items = ', '.join([str(i) for i in range(width)])
+    return '\n'.join([f'mut numbers_{i} as [{items}]\nmut scaled_{i} as numbers_{i} mult 3\nmut total_{i} as sum(scaled_{i})' for i in range(lines)])
+
+
+def generate_conditions(amount: int) -> str:
+    return '\n'.join([
+        'immut limit as 4',
+        'mut x as 5',
+        'mut y as 3',
+        'mut c as 0',
+        f'repeat {amount}',
+        '    if x more y and (y plus 1) is limit then',
+        '        set c as c plus x mult 2',
+        '    end',
+        'end',
+    ])
+
+
+def generate_containers(amount: int) -> str:
+    return '\n'.join([
+        'container config',
+        '    container db',
+        '        mut port as 5432',
+        '        mut hits as 0',
+        '    end',
+        'end',
+        'mut total as 0',
+        f'repeat {amount}',
+        '    set total as total plus config.db.port',
+        '    set config.db.hits as config.db.hits plus 1',
+        'end',
+    ])
+
+
+def generate_import_folder(folder: Path, files: int):
+    for i in range(files):
+        with open(Path(folder, f'module_{i}.mend'), 'wt') as f:
+            f.write(f'immut name_{i} as "module {i}"\nmut value_{i} as {i}\nfunc function_{i}(a)\n    return a\nend\n')
+
+
+def generate_shared_imports(folder: Path, files: int):
+    # every file imports the same helper, which only has to run once
+    with open(Path(folder, 'helper.mend'), 'wt') as f: f.write('immut greeting as "hello"\nfunc helper(a)\n    return a\nend\n')
+    for i in range(files):
+        with open(Path(folder, f'user_{i}.mend'), 'wt') as f: f.write(f'import "{Path(folder, "helper.mend").as_posix()}"\nmut value_{i} as {i}\n')
+
+
+
+def linelexer_lex(text: str): return [[t for t in LineLexer(l).lex_to_tokens() if t.type != TT.COMMENT] for l in text.split('\n')]
+
+
+def fresh_imports():
+    # every import benchmark measures a cold import, not the compile cache
+    pymend.compiled_files.clear()
+    # import_mend_file on its own imports through the thread's registry, not one of a run's own
+    pymend.use_registry(pymend.ModuleRegistry())
+    pymend.use_compile_cache = False
+
+
+def make_benchmarks(scale: float, workdir: Path) -> dict[str, tuple[Any, int]]:
+    n = lambda v: max(1, int(v * scale))
+    benchmarks = {}
+
+    large = generate_source(n(20000))
+    large_tokens = sum([len(l) for l in lex_file(large)])
+    benchmarks['lex_linelexer_large_file'] = (lambda: linelexer_lex(large), large_tokens)
+    benchmarks['lex_file_large_file'] = (lambda: lex_file(large), large_tokens)
+
+    decls = lex_file(generate_declarations(n(3000)))
+    benchmarks['interpret_declarations'] = (lambda: interpret(decls), len(decls))
+
+    depth, amount = 3, n(40)
+    nested = lex_file(generate_nested_repeat(depth, amount))
+    benchmarks['interpret_nested_repeat'] = (lambda: interpret(nested), amount ** depth)
+
+    calls = n(20000)
+    calling = lex_file(generate_calls(calls))
+    benchmarks['interpret_function_calls'] = (lambda: interpret(calling), calls)
+
+    work = interpret(lex_file(generate_calls(0)), isimported=True)[2]['work']
+    work_args = [[1, MendFuncArg('a')], ["y", MendFuncArg('b')]]
+    def run_function():
+        for _ in range(calls): work.run('', work_args)
+    benchmarks['mendfunction_run'] = (run_function, calls)
+
+    interpreter = pymend.Interpreter()
+    interpreter.load(generate_declarations(n(300)))
+    snippet = interpreter.compile('func work(a)\n    return a\nend\nmut local as var_1\nset local as const_2\nmut result as work(local)')
+    snippets = n(5000)
+    def run_snippets():
+        for _ in range(snippets): interpreter.execute(snippet)
+    benchmarks['interpreter_execute'] = (run_snippets, snippets)
+
+    lists = lex_file(generate_lists(n(300), 200))
+    benchmarks['interpret_big_lists'] = (lambda: interpret(lists), n(300) * 200)
+
+    # compiled once, only the bulk operations are timed
+    numbers = pymend.compile_code(lex_file(generate_number_lists(n(300), 200)))
+    benchmarks['execute_number_lists'] = (lambda: pymend.execute(numbers), n(300) * 200)
+
+    amount = n(20000)
+    conditions = pymend.compile_code(lex_file(generate_conditions(amount)))
+    benchmarks['execute_conditions'] = (lambda: pymend.execute(conditions), amount)
+
+    containers = pymend.compile_code(lex_file(generate_containers(amount)))
+    benchmarks['execute_container_members'] = (lambda: pymend.execute(containers), amount)
+
+    folder = Path(workdir, 'wide')
+    folder.mkdir()
+    files = n(200)
+    generate_import_folder(folder, files)
+    importing = lex_file('import "wide"')
+    def import_folder(): fresh_imports(); interpret(importing, root_folder=str(workdir))
+    benchmarks['import_directory'] = (import_folder, files)
+
+    def preload_folder(): fresh_imports(); pymend.preload(folder)
+    benchmarks['preload_directory'] = (preload_folder, files)
+
+    shared = Path(workdir, 'shared')
+    shared.mkdir()
+    generate_shared_imports(shared, files)
+    pymend.preload(shared)
+    importing_shared = lex_file('import "shared"')
+    def import_shared(): interpret(importing_shared, root_folder=str(workdir))
+    benchmarks['import_shared_helper'] = (import_shared, files)
+
+    pymend.use_compile_cache = True
+    pymend.freeze(folder)
+    def import_snapshot(): pymend.use_compile_cache = True; pymend.snapshots.clear(); interpret(importing, root_folder=str(workdir))
+    benchmarks['import_snapshot'] = (import_snapshot, files)
+
+    def import_single():
+        for i in range(files): fresh_imports(); import_mend_file(str(folder), f'module_{i}.mend', Scope())
+    benchmarks['import_mend_file'] = (import_single, files)
+
+    return benchmarks
+
+
+def measure(func, repeats: int, name: str = '') -> tuple[float, int]:
+    # a workload that logs an error is timing the error instead of the work, so it fails rather than becoming a baseline
+    best = None
+    diagnostics = pymend.CollectOutput()
+    previous = pymend.use_output(pymend.CollectOutput(), diagnostics)
+    try:
+        with redirect_stdout(io.StringIO()):
+            for _ in range(repeats):
+                start = perf_counter()
+                func()
+                took = perf_counter() - start
+                if best == None or took < best: best = took
+
+            tracemalloc.start()
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    finally: pymend.restore_output(previous)
+    errors = [l for l in diagnostics.lines() if l.startswith('error')]
+    if len(errors) > 0: raise RuntimeError(f"benchmark '{name}' logged {len(errors)} error(s), the first: {errors[0]}")
+    return best, peak
+
+
+def run_suite(names: list[str] = [], scale: float = 1.0, repeats: int = 3) -> dict[str, dict[str, float]]:
+    use_compile_cache = pymend.use_compile_cache
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            benchmarks = make_benchmarks(scale, Path(workdir))
+            for name, (func, ops) in benchmarks.items():
+                if len(names) > 0 and name not in names: continue
+                took, peak = measure(func, repeats, name)
+                results[name] = {'ops': ops, 'seconds': took, 'ops_per_sec': ops / took, 'peak_memory': peak}
+                print(f"{name}: {ops / took:,.0f} ops/sec, peak memory {peak / 1024:,.0f}KiB")
+    finally: pymend.use_compile_cache = use_compile_cache
+    return results
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float) -> list[str]:
+    out = []
+    for name, base in baseline.items():
+        if name not in results: continue
+        now = results[name]
+        if now['ops_per_sec'] < base['ops_per_sec'] * (1 - threshold):
+            out.append(f"{name}: {now['ops_per_sec']:,.0f} ops/sec is more than {threshold:.0%} below the baseline's {base['ops_per_sec']:,.0f}")
+        if now['peak_memory'] > base['peak_memory'] * (1 + threshold):
+            out.append(f"{name}: peak memory {now['peak_memory']:,} bytes is more than {threshold:.0%} above the baseline's {base['peak_memory']:,}")
+    return out
+
+
+def bench_lexers(lines: int = 20000, repeats: int = 5):
+    text = generate_source(lines)
+    token_count = sum([len(l) for l in lex_file(text)])
+    results = {}
+    for name, func in (('LineLexer', linelexer_lex), ('lex_file', lex_file)):
+        took, _ = measure(lambda: func(text), repeats, name)
+        results[name] = token_count / took
+        print(f"{name}: {token_count} tokens in {took:.4f}s ({results[name]:,.0f} tokens/sec)")
+    print(f"speedup: {results['lex_file'] / results['LineLexer']:.2f}x")
+    return results
+
+
+def cli():
+    parser = argparse.ArgumentParser(description="benchmarks for the Python Mend interpreter")
+    parser.add_argument('names', nargs='*', help="benchmarks to run(all of them by default)")
+    parser.add_argument('--scale', type=float, default=1.0, help="multiplier for the size of every workload")
+    parser.add_argument('--repeats', type=int, default=3, help="timed runs per benchmark, the best one is kept")
+    parser.add_argument('--output', default='bench_results.json', help="where to write the results")
+    parser.add_argument('--baseline', default='bench_baseline.json', help="results to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed regression against the baseline(0.2 = 20%%)")
+    parser.add_argument('--compare-lexers', action='store_true', help="only compare LineLexer against lex_file")
+    args = parser.parse_args()
+
+    if args.compare_lexers: bench_lexers(); return 0
+
+    results = run_suite(args.names, args.scale, args.repeats)
+    with open(args.output, 'wt') as f: json.dump(results, f, indent=4)
+
+    if args.save_baseline:
+        with open(args.baseline, 'wt') as f: json.dump(results, f, indent=4)
+        print(f"saved baseline to '{args.baseline}'")
+        return 0
+
+    if not Path(args.baseline).exists(): print(f"no baseline at '{args.baseline}', nothing to compare against"); return 0
+    with open(args.baseline, 'rt') as f: baseline = json.load(f)
+    regressions = find_regressions(results, baseline, args.threshold)
+    for r in regressions: print(f"regression: {r}")
+    return 1 if len(regressions) > 0 else 0
+
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -1,7 +1,25 @@
-from enum import Enum
-from random import randint
+from enum import Enum, IntEnum
+import sys
+import os
+import re
+import pickle
+import hashlib
+import threading
+from contextlib import contextmanager
+from abc import ABC, abstractmethod
+from time import perf_counter
 from typing import Any
+from collections import OrderedDict
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from array import array
+from itertools import repeat
+import operator
+
+# optional, typed lists do their arithmetic with it when it's installed
+try: import numpy
+except ImportError: numpy = None
 
 
 
@@ -11,6 +29,10 @@ ALPHABET_HIGH = ALPHABET_LOW.upper()
 ALPHABET = ALPHABET_LOW + ALPHABET_HIGH
 VALID_FOR_VARNAMES = ALPHABET + '_' + DIGITS
 
+LANG_VERSION = '1.2'
+# compiled files are cached per interpreter build, so any change to this file invalidates them
+with open(__file__, 'rb') as _self_file: INTERPRETER_VERSION = LANG_VERSION + '-' + hashlib.sha1(_self_file.read()).hexdigest()[:12]
+
 
 KEYWORDS = [
     'if',
@@ -74,34 +96,42 @@ def extend_dict(orig: dict, exentsion: dict, overwrite_existing: bool = False):
 
 
 
-class TT(Enum):
-    STRING = 'STRING'
-    INT = 'INT'
-    FLOAT = 'FLOAT'
-    BOOL = 'BOOL'
-    KEYWORD = 'KEYWORD'
-    IDENT = 'IDENT'
-    ILLEGAL = 'ILLEGAL'
+class TT(IntEnum):
+    STRING = 0
+    INT = 1
+    FLOAT = 2
+    BOOL = 3
+    KEYWORD = 4
+    IDENT = 5
+    ILLEGAL = 6
     #EQUALS = 'EQUALS'
-    COMMENT = 'COMMENT'
-    COMMA = 'COMMA'
-    LBRACKET = 'LBRACKET'
-    RBRACKET = 'RBRACKET'
-    LPAREN = 'LPAREN'
-    RPAREN = 'RPAREN'
-    LBRACE = 'LBRACE'
-    RBRACE = 'RBRACE'
-    DEBUG = 'DEBUG'
-    STOP = 'STOP'
-    PERIOD = 'PERIOD'
-    STATELABEL = 'STATELABEL'
-    EOF = 'EOF'
+    COMMENT = 7
+    COMMA = 8
+    LBRACKET = 9
+    RBRACKET = 10
+    LPAREN = 11
+    RPAREN = 12
+    LBRACE = 13
+    RBRACE = 14
+    DEBUG = 15
+    STOP = 16
+    PERIOD = 17
+    STATELABEL = 18
+    EOF = 19
+
+    def __str__(self): return f'TT.{self.name}'
 
 
 class Token:
-    def __init__(self, type, value=None):
+    __slots__ = ('type', 'value')
+
+    def __init__(self, type: TT, value=None):
         self.type = type
         self.value = value
+
+    def __getstate__(self): return (self.type, self.value)
+
+    def __setstate__(self, state): self.type, self.value = state
     
     def __repr__(self):
         return f'{self.type}: {self.value}'
@@ -133,6 +163,7 @@ class LineLexer:
             elif self.c_char == ']': tokens.append(Token(TT.RBRACKET)); self.advance()
             elif self.c_char == '{': tokens.append(Token(TT.LBRACE)); self.advance()
             elif self.c_char == '}': tokens.append(Token(TT.RBRACE)); self.advance()
+            elif self.c_char == '.': tokens.append(Token(TT.PERIOD)); self.advance()
             elif self.c_char == '-': tokens.append(self.make_comment('-'))
             elif self.c_char == '/': tokens.append(self.make_comment('/'))
             elif self.c_char == '#': tokens.append(self.make_comment())
@@ -206,6 +237,77 @@ class LineLexer:
         return Token(TT.COMMENT, comment_str)
 
 
+LEX_PATTERN = re.compile('|'.join([
+    r'(?P<SPACE>[ \t]+)',
+    r'(?P<NEWLINE>\n)',
+    r'(?P<NUMBER>[0-9]+(?:\.[0-9]*)?)',
+    r'(?P<STRING>"[^"\n]*"?)',
+    r'(?P<IDENT>[A-Za-z_][A-Za-z_0-9]*)',
+    r'(?P<PUNCT>[,()\[\]{}.])',
+    r'(?P<COMMENT>(?:--|//|[#;]) ?[^\n]*)',
+    r'(?P<BADCOMMENT>[-/])',
+    r'(?P<STATELABEL>@[A-Za-z_0-9]+)',
+    r'(?P<BADLABEL>@)',
+    r'(?P<DEBUG>\?(?=\n|\Z))',
+    r'(?P<BADDEBUG>\?)',
+    r'(?P<ILLEGAL>.)',
+]))
+
+PUNCTUATION = {
+    ',': TT.COMMA,
+    '(': TT.LPAREN,
+    ')': TT.RPAREN,
+    '[': TT.LBRACKET,
+    ']': TT.RBRACKET,
+    '{': TT.LBRACE,
+    '}': TT.RBRACE,
+    '.': TT.PERIOD,
+}
+
+KEYWORD_SET = frozenset(KEYWORDS)
+
+# tokens without a varying value are never modified, so the lexer hands out shared instances of them
+KEYWORD_TOKENS = {k: Token(TT.KEYWORD, sys.intern(k)) for k in KEYWORDS}
+PUNCTUATION_TOKENS = {c: Token(PUNCTUATION[c]) for c in PUNCTUATION}
+DEBUG_TOKEN = Token(TT.DEBUG)
+
+
+def lex_file(text: str, keep_comments: bool = False) -> list[list[Token]]:
+    # tokenizes a whole file in one pass, giving the same tokens as running LineLexer on every line
+    token_lines: list[list[Token]] = []
+    tokens: list[Token] = []
+    next_char = lambda i: text[i] if i < len(text) and text[i] != '\n' else None
+
+    for m in LEX_PATTERN.finditer(text):
+        kind = m.lastgroup
+        if kind == 'SPACE': continue
+        elif kind == 'IDENT':
+            ident_str = m.group()
+            tokens.append(KEYWORD_TOKENS[ident_str] if ident_str in KEYWORD_SET else Token(TT.IDENT, sys.intern(ident_str)))
+        elif kind == 'NEWLINE': token_lines.append(tokens); tokens = []
+        elif kind == 'PUNCT': tokens.append(PUNCTUATION_TOKENS[m.group()])
+        elif kind == 'NUMBER':
+            num_str = m.group()
+            tokens.append(Token(TT.FLOAT, float(num_str)) if '.' in num_str else Token(TT.INT, int(num_str)))
+        elif kind == 'STRING':
+            string_str = m.group()[1:]
+            tokens.append(Token(TT.STRING, string_str[:-1] if string_str.endswith('"') else string_str))
+        elif kind == 'COMMENT':
+            if keep_comments:
+                comment_str = m.group()[1:] if m.group()[0] in '#;' else m.group()[2:]
+                tokens.append(Token(TT.COMMENT, comment_str[1:] if comment_str.startswith(' ') else comment_str))
+        elif kind == 'STATELABEL': tokens.append(Token(TT.STATELABEL, sys.intern(m.group()[1:])))
+        elif kind == 'DEBUG': tokens.append(DEBUG_TOKEN)
+        elif kind == 'BADCOMMENT':
+            found = next_char(m.end())
+            tokens.append(Token(TT.ILLEGAL, (found, f"expected '{m.group()}' but found '{found}' instead")))
+        elif kind == 'BADLABEL': tokens.append(Token(TT.ILLEGAL, (next_char(m.end()), "expected label name after '@'")))
+        elif kind == 'BADDEBUG': tokens.append(Token(TT.ILLEGAL, ('?', "question mark must be at end of line")))
+        else: tokens.append(Token(TT.ILLEGAL, m.group()))
+    token_lines.append(tokens)
+    return token_lines
+
+
 class MendFuncArg:
     def __init__(self, name: str, required: bool = True) -> None:
         self.__name = name
@@ -219,16 +321,78 @@ class MendFuncArg:
 
     def __repr__(self) -> str: return self.__name if self.__required else {self.__name} + "(op)"
 
+PURE_CACHE_SIZE = 128
+
+class PureCache:
+    # least recently used results of a '@pure' function, keyed by its argument values
+    def __init__(self, maxsize: int = PURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__entries: OrderedDict = OrderedDict()
+
+    def get(self, key: tuple, default: Any = None):
+        if key in self.__entries:
+            self.hits += 1
+            self.__entries.move_to_end(key)
+            return self.__entries[key]
+        self.misses += 1
+        return default
+
+    def put(self, key: tuple, value: Any):
+        self.__entries[key] = value
+        self.__entries.move_to_end(key)
+        if len(self.__entries) > self.maxsize:
+            self.__entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self): self.__entries.clear()
+
+    def info(self) -> dict[str, int]: return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self.__entries), 'maxsize': self.maxsize}
+
+    def __len__(self): return len(self.__entries)
+
+
+def freeze_value(value: Any):
+    # -> a hashable stand-in for a Mend value, or None if results for it can't be cached(functions, containers)
+    if isinstance(value, (str, int, float, bool, Null)): return (type(value), value)
+    if isinstance(value, NumList): return (NumList, value.data.typecode, tuple(value.data))
+    if isinstance(value, list):
+        frozen = tuple([freeze_value(v) for v in value])
+        return None if None in frozen else (list, frozen)
+    return None
+
+
 class MendFunction:
-    def __init__(self, name: str, args: list[MendFuncArg], content: list[list[Token]], is_bulitin: bool = False):
+    def __init__(self, name: str, args: list[MendFuncArg], content: Any, is_bulitin: bool = False, is_pure: bool = False, cache: PureCache = None, closure: dict = None):
         self.__name = name
         self.__args = args
         self.__content = content
         self.__builtin = is_bulitin
-    
-    def run(self, root_folder: str = '', arguments: list[list[Any, MendFuncArg]] = []) -> tuple[dict[str, Any], ImmutDict, dict[str, Any]]: return interpret(token_lines=self.__content, isfunc=True, funcargs=arguments, root_folder=root_folder)
-
-    def get_content(self) -> list[list[Token]]: return self.__content
+        self.__pure = is_pure
+        self.__cache = cache if cache != None or not is_pure else PureCache()
+        # the functions of the scope this one was declared in, so it can call them(and itself)
+        self.__closure = closure if closure != None else {}
+
+    def run(self, root_folder: str = '', arguments: list[list[Any, MendFuncArg]] = []) -> Any:
+        key, returned = self.cached(arguments)
+        if returned is not UNSET: return returned
+        returned = execute(self.__content, isfunc=True, funcargs=arguments, root_folder=root_folder, funcs=self.__closure)
+        if not isinstance(returned, FullReturn): self.remember(key, returned)
+        return returned
+
+    def cached(self, arguments: list[list[Any, MendFuncArg]]) -> tuple[tuple, Any]:
+        # -> (cache key, cached result or UNSET), the key is None when the result can't be cached
+        if not self.__pure: return None, UNSET
+        key = tuple([freeze_value(a[0]) for a in arguments])
+        if None in key: return None, UNSET
+        return key, self.__cache.get(key, UNSET)
+
+    def remember(self, key: tuple, returned: Any):
+        if key != None: self.__cache.put(key, returned)
+
+    def get_content(self) -> list[Any]: return self.__content
 
     def get_args(self) -> list[MendFuncArg]: return self.__args
 
@@ -238,53 +402,172 @@ class MendFunction:
 
     def isbuiltin(self) -> bool: return self.__builtin
 
+    def isnative(self) -> bool: return False
+
+    def ispure(self) -> bool: return self.__pure
+
+    def cache_info(self) -> dict[str, int]: return self.__cache.info() if self.__cache != None else None
+
     def get_name(self) -> str: return self.__name
 
     def hasname(self) -> bool: return self.__name.strip() != ''
     
     def rename(self, new_name: str) -> str: self.__name = new_name
 
-    def copy(self, use_self_name: bool = True, name_to_use_instead: str = ""): return MendFunction(self.__name, self.__args, self.__content, self.__builtin) if use_self_name else MendFunction(name_to_use_instead, self.__args, self.__content, self.__builtin)
+    def get_closure(self) -> dict: return self.__closure
+
+    def copy(self, use_self_name: bool = True, name_to_use_instead: str = ""): return MendFunction(self.__name if use_self_name else name_to_use_instead, self.__args, self.__content, self.__builtin, self.__pure, self.__cache, self.__closure)
 
     def __repr__(self) -> str:
         str_args = ', '.join([str(a) for a in self.__args])
         out = f"function {self.__name}({str_args})" + "{" + f"{str(self.__content).removeprefix('[').removesuffix(']')}" + "}"
+        if self.__pure: out = 'pure ' + out
         if self.__builtin: out = 'builtin ' + out
         return out
 
 
-class NotNeeded: pass
+class NativeFunction(MendFunction):
+    # a builtin written in Python, called like any Mend function but run straight away instead of getting a frame
+    def __init__(self, name: str, args: list[MendFuncArg], func):
+        super().__init__(name, args, func, is_bulitin=True)
+
+    def isnative(self) -> bool: return True
+
+    def call(self, arguments: list[list[Any, MendFuncArg]], line: int) -> Any: return self.get_content()(*[a[0] for a in arguments], line)
+
+    def run(self, root_folder: str = '', arguments: list[list[Any, MendFuncArg]] = []) -> Any: return self.call(arguments, 0)
+
+    def isempty(self) -> bool: return False
+
+    def copy(self, use_self_name: bool = True, name_to_use_instead: str = ""): return NativeFunction(self.get_name() if use_self_name else name_to_use_instead, self.get_args(), self.get_content())
+
+    def __repr__(self) -> str: return f"builtin function {self.get_name()}({', '.join([str(a) for a in self.get_args()])})"
+
+
+def reduce_list(name: str, reducer):
+    def run(value: Any, line: int):
+        if value.__class__ is not NumList and not isinstance(value, list): log_error(f"'{name}' expects a list, but got '{value}' instead", line); return FullReturn()
+        if len(value) == 0 and name in ('min', 'max'): log_error(f"can't take the {name} of an empty list", line); return FullReturn()
+        # a typed list is reduced straight from its buffer
+        try: return reducer(value.data if value.__class__ is NumList else value)
+        except TypeError as e: log_error(e, line); return FullReturn()
+    return run
+
+def builtin_len(value: Any, line: int):
+    if value.__class__ is not NumList and not isinstance(value, (list, str)): log_error(f"'len' expects a list or a string, but got '{value}' instead", line); return FullReturn()
+    return len(value)
+
+# functions every scope can call without declaring or importing them, a declared function with the same name takes precedence
+BUILTIN_FUNCTIONS: dict[str, NativeFunction] = {
+    'sum': NativeFunction('sum', [MendFuncArg('list')], reduce_list('sum', sum)),
+    'min': NativeFunction('min', [MendFuncArg('list')], reduce_list('min', min)),
+    'max': NativeFunction('max', [MendFuncArg('list')], reduce_list('max', max)),
+    'len': NativeFunction('len', [MendFuncArg('value')], builtin_len),
+}
+
+
+class ContainerLayout:
+    # where every path of a container tree('db', 'host') sits in its flat list of values; never changed once built, so every copy of the container can share it
+    __slots__ = ('paths', 'groups', 'immut')
+
+    def __init__(self):
+        self.paths: dict[tuple[str], int] = {}
+        # paths that are containers themselves(they have no value of their own), and whether they're immutable
+        self.groups: dict[tuple[str], bool] = {}
+        self.immut: set[int] = set()
+
+
 class MendContainer:
-    def __init__(self, vars: dict[str, Any], consts: ImmutDict, funcs: dict[str, MendFunction], containers: dict[str, Any]):
-        self.__vars = vars
-        self.__consts = consts
-        self.__funcs = funcs
-        self.__containers: dict[str, MendContainer] = containers
-    
-    def access(self, path: list[str], value: Any = NotNeeded) -> tuple[Any, bool]:
-        cpath = path.pop(0)
-        if cpath in list(self.__containers):
-            if not isinstance(value, MendContainer): log_error(f"invalid value '{value}' for container assignment"); return FullReturn(), False
-            if len(path) == 0: self.__containers[cpath] = value; return None, True
-            return self.__containers[cpath].access(path.copy(), value)
-        else:
-            if cpath in list(self.__vars):
-                if value != NotNeeded: self.__vars[cpath] = value; return None, True
-                else: return self.__vars[cpath], True
-            else:
-                if cpath in list(self.__consts.keys()):
-                    if value != NotNeeded: self.__consts[cpath] = value; return None, True
-                    else: return self.__consts[cpath], True
-                else:
-                    if cpath in list(self.__funcs):
-                        if value != NotNeeded: self.__funcs[cpath] = value; return None, True
-                        else: return self.__funcs[cpath], True
-                    else:
-                        return TT.ILLEGAL, False
-    
-    def copy(self): return MendContainer(self.__vars, self.__consts, self.__funcs, self.__containers)
+    # nested containers are flattened into the outermost one, so 'a.b.c' is a single lookup instead of one per level
+    __slots__ = ('layout', 'values', 'shared')
+
+    def __init__(self, layout: ContainerLayout = None, values: list[Any] = None):
+        self.layout = layout if layout != None else ContainerLayout()
+        self.values = values if values != None else []
+        self.shared = False
+
+    def add(self, path: tuple[str], value: Any, immutable: bool = False):
+        # only while the container is being built, before anything else has seen its layout
+        layout = self.layout
+        if value.__class__ is MendContainer:
+            # everything in an immutable container is immutable too
+            layout.groups[path] = immutable
+            for sub, immut in value.layout.groups.items(): layout.groups[path + sub] = immutable or immut
+            for sub, index in value.layout.paths.items(): self.add(path + sub, value.values[index], immutable or index in value.layout.immut)
+            return
+        if immutable: layout.immut.add(len(self.values))
+        layout.paths[path] = len(self.values)
+        self.values.append(value)
+
+    def get(self, path: tuple[str]) -> Any:
+        # -> the value at the path(a nested container comes out as a container of its own) or UNSET
+        index = self.layout.paths.get(path)
+        if index != None: return self.values[index]
+        if path in self.layout.groups: return self.sub(path)
+        return UNSET
+
+    def sub(self, prefix: tuple[str]):
+        out = MendContainer()
+        n = len(prefix)
+        for path, immut in self.layout.groups.items():
+            if len(path) > n and path[:n] == prefix: out.layout.groups[path[n:]] = immut
+        for path, index in self.layout.paths.items():
+            if path[:n] == prefix: out.add(path[n:], self.values[index], index in self.layout.immut)
+        return out
 
-    def __repr__(self) -> str: return "container{\n" + f"   vars: {self.__vars}\n   consts: {self.__consts}\n   funcs: {self.__funcs}\n   containers: {self.__containers}\n" + "}"
+    def put(self, index: int, value: Any):
+        if self.shared: self.values = list(self.values); self.shared = False
+        self.values[index] = value
+
+    def set(self, path: tuple[str], value: Any) -> str:
+        # -> what's wrong with the assignment, or None if it went through
+        layout = self.layout
+        index = layout.paths.get(path)
+        if index == None and path not in layout.groups: return 'unknown member'
+        if index in layout.immut: return 'immutable member'
+        for i in range(1, len(path) + 1):
+            if layout.groups.get(path[:i], False): return 'immutable member'
+        if index != None and value.__class__ is not MendContainer: self.put(index, value)
+        else: self.reshape(path, value)
+
+    def reshape(self, path: tuple[str], value: Any):
+        # a container member being replaced(or a value turning into one) gives the container a new layout, which makes every cached lookup look again
+        out = MendContainer()
+        n = len(path)
+        for p, immut in self.layout.groups.items():
+            if p[:n] != path: out.layout.groups[p] = immut
+        placed = False
+        for p, index in self.layout.paths.items():
+            if p[:n] != path: out.add(p, self.values[index], index in self.layout.immut)
+            elif not placed: out.add(path, value); placed = True
+        if not placed: out.add(path, value)
+        self.layout, self.values, self.shared = out.layout, out.values, False
+
+    def copy(self):
+        # copy-on-write, the values are only copied when one of the two changes one
+        copied = MendContainer(self.layout, self.values)
+        copied.shared = self.shared = True
+        return copied
+
+    def tree(self) -> dict[str, Any]:
+        out = {}
+        for path, index in self.layout.paths.items():
+            d = out
+            for name in path[:-1]: d = d.setdefault(name, {})
+            d[path[-1]] = self.values[index]
+        # empty containers have no values to show up with
+        for path in self.layout.groups:
+            d = out
+            for name in path: d = d.setdefault(name, {})
+        return out
+
+    def __eq__(self, other): return isinstance(other, MendContainer) and self.tree() == other.tree()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        show = lambda d: 'container{' + ', '.join([f'{k}: {show(v) if v.__class__ is dict else v}' for k, v in d.items()]) + '}'
+        return show(self.tree())
 
 
 
@@ -292,12 +575,15 @@ class AnyToken:
     def __str__(self): return 'AnyToken'
 
 def istoken(tok: Token, type: Any | tuple[Any] = AnyToken, value: Any | tuple[Any] = AnyToken):
-    ofvalue = lambda v, check: v in check if isinstance(check, (tuple, list)) else v == check
-    #print(f'{tok}, {type}, {value}, {tok.type == type}, {tok.value == value}')
-    if type == AnyToken and value == AnyToken: return isinstance(tok, Token)
-    if type == AnyToken: return ofvalue(tok.value, value)
-    if value == AnyToken: return ofvalue(tok.type, type)
-    return ofvalue(tok.type, type) and ofvalue(tok.value, value)
+    # token kinds are small ints, so every check here is an int compare or a tuple scan
+    if type is not AnyToken:
+        if type.__class__ is tuple or type.__class__ is list:
+            if tok.type not in type: return False
+        elif tok.type != type: return False
+    if value is not AnyToken:
+        if value.__class__ is tuple or value.__class__ is list: return tok.value in value
+        return tok.value == value
+    return type is not AnyToken or isinstance(tok, Token)
 
 def hastoken(tokens: list[Token], type: Any | tuple[Any] = AnyToken, value: Any | tuple[Any] = AnyToken):
     for t in tokens:
@@ -306,34 +592,197 @@ def hastoken(tokens: list[Token], type: Any | tuple[Any] = AnyToken, value: Any
 
 
 
+class NumList:
+    # a list of only ints or only floats, kept in a typed buffer(8 bytes an item) instead of a list of boxed values
+    __slots__ = ('data',)
+
+    def __init__(self, data: array): self.data = data
+
+    def typename(self) -> str: return 'int' if self.data.typecode == 'q' else 'float'
+
+    def __len__(self): return len(self.data)
+
+    def __iter__(self): return iter(self.data)
+
+    def __getitem__(self, index): return self.data[index]
+
+    def __bool__(self): return len(self.data) > 0
+
+    def __eq__(self, other):
+        if isinstance(other, NumList): return self.data == other.data
+        if isinstance(other, list): return self.data.tolist() == other
+        return False
+
+    def __hash__(self): return hash(tuple(self.data))
+
+    def __repr__(self): return str(self.data.tolist())
+
+
+def pack_list(values: list) -> NumList | list:
+    # homogeneous int or float lists get a typed buffer, anything else(mixed, nested, empty, too big for 64 bits) stays a plain list
+    if len(values) == 0: return values
+    kind = values[0].__class__
+    if kind is not int and kind is not float: return values
+    for v in values:
+        if v.__class__ is not kind: return values
+    if kind is float: return NumList(array('d', values))
+    try: return NumList(array('q', values))
+    except OverflowError: return values
+
+
+ELEMENTWISE_OPS = {'plus': operator.add, 'minus': operator.sub, 'mult': operator.mul, 'div': operator.truediv, 'fdiv': operator.floordiv, 'less': operator.lt, 'more': operator.gt}
+NUMPY_DTYPES = {'q': 'int64', 'd': 'float64'}
+
+# numpy is only used for float results and comparisons, int arithmetic keeps Python's unbounded ints
+use_numpy = numpy != None
+
+def elementwise(op: str, left: Any, right: Any):
+    # -> a NumList(or a plain list of bools for 'less' and 'more'), the same op applied to every item in one bulk call
+    func = ELEMENTWISE_OPS[op]
+    lnum, rnum = isinstance(left, NumList), isinstance(right, NumList)
+    if lnum and rnum and len(left) != len(right): raise ValueError(f"can't {op} lists of different lengths({len(left)} and {len(right)})")
+    for side, isnum in ((left, lnum), (right, rnum)):
+        if not isnum and (side.__class__ not in (int, float, bool)): raise TypeError(f"can't {op} a number list and '{side}'")
+    ints = all([s.data.typecode == 'q' if s.__class__ is NumList else s.__class__ is not float for s in (left, right)])
+    compare = op in ('less', 'more')
+    if use_numpy and (compare or op == 'div' or not ints):
+        a = numpy.frombuffer(left.data, NUMPY_DTYPES[left.data.typecode]) if lnum else left
+        b = numpy.frombuffer(right.data, NUMPY_DTYPES[right.data.typecode]) if rnum else right
+        with numpy.errstate(divide='raise', invalid='raise'):
+            try: result = func(a, b)
+            except FloatingPointError: raise ZeroDivisionError('division by zero')
+        if compare: return result.tolist()
+        return NumList(array('d', result.astype('float64').tobytes()))
+    values = map(func, left.data, right.data) if lnum and rnum else map(func, left.data, repeat(right)) if lnum else map(func, repeat(left), right.data)
+    if compare: return list(values)
+    if not ints or op == 'div': return NumList(array('d', values))
+    values = list(values)
+    try: return NumList(array('q', values))
+    except OverflowError: return values
+
+
+def apply_op(op: str, left: Any, right: Any):
+    if op in ELEMENTWISE_OPS and (left.__class__ is NumList or right.__class__ is NumList): return elementwise(op, left, right)
+    match op:
+        case 'is': return left == right
+        case 'not' | 'isnot': return left != right
+        case 'less': return left < right
+        case 'more': return left > right
+        case 'plus': return left + right
+        case 'minus': return left - right
+        case 'mult': return left * right
+        case 'div': return left / right
+        case 'fdiv': return left // right
+        case 'and': return bool(left and right)
+        case 'or': return bool(left or right)
+        case default: return None
+
+
+def projected_size(op: str, left: Any, right: Any) -> int:
+    # -> how many items(characters or list items) repeating or joining strings and lists will make, 0 for anything else
+    if op == 'mult':
+        if left.__class__ in (str, list) and right.__class__ is int: return len(left) * max(right, 0)
+        if right.__class__ in (str, list) and left.__class__ is int: return len(right) * max(left, 0)
+    elif op == 'plus' and left.__class__ is right.__class__ and left.__class__ in (str, list): return len(left) + len(right)
+    return 0
+
+
 def getstate(left: Token, op: Token, right: Token, line: int):
-    try:
-        match op.value:
-            case 'is': return left.value == right.value
-            case 'not' | 'isnot': return left.value != right.value
-            case 'less': return left.value < right.value
-            case 'more': return left.value > right.value
-            case 'plus': return left.value + right.value
-            case 'minus': return left.value - right.value
-            case 'mult': return left.value * right.value
-            case 'div': return left.value / right.value
-            case 'fdiv': return left.value // right.value
-            case default: return None
-    except ValueError as e: log_error(e, line); return FullReturn()
+    try: return apply_op(op.value, left.value, right.value)
+    except (ValueError, TypeError, ArithmeticError) as e: log_error(e, line); return FullReturn()
+
+
+class MendOutput(ABC):
+    # where Mend's output goes, a sink only has to say how text is written
+    @abstractmethod
+    def write(self, text: str): pass
+
+    def flush(self): pass
+
+    def close(self): self.flush()
+
+
+class BufferedOutput(MendOutput):
+    # flush_policy is 'line'(write through), 'size'(write once buffer_size characters are waiting) or 'end'(only when flushed)
+    def __init__(self, stream = None, flush_policy: str = 'size', buffer_size: int = 8192):
+        if flush_policy not in ('line', 'size', 'end'): raise ValueError(f"unknown flush policy '{flush_policy}'")
+        self.__stream = stream
+        self.flush_policy = flush_policy
+        self.buffer_size = buffer_size
+        self.__buffer: list[str] = []
+        self.__waiting = 0
+
+    # without a stream, whatever sys.stdout is at the time gets written to
+    def stream(self): return self.__stream if self.__stream != None else sys.stdout
+
+    def write(self, text: str):
+        if self.flush_policy == 'line': self.stream().write(text); return
+        self.__buffer.append(text)
+        self.__waiting += len(text)
+        if self.flush_policy == 'size' and self.__waiting >= self.buffer_size: self.flush()
+
+    def flush(self):
+        stream = self.stream()
+        if len(self.__buffer) > 0:
+            stream.write(''.join(self.__buffer))
+            self.__buffer.clear()
+            self.__waiting = 0
+        stream.flush()
+
 
+class FileOutput(BufferedOutput):
+    def __init__(self, path: str | Path, append: bool = False, flush_policy: str = 'size', buffer_size: int = 65536):
+        self.__file = open(path, 'at' if append else 'wt')
+        super().__init__(self.__file, flush_policy, buffer_size)
 
-def log_error(details: str, line: int): print(f"error: {details} on line {line+1}")
+    def close(self):
+        if self.__file.closed: return
+        self.flush()
+        self.__file.close()
 
-def log_warning(details: str, line: int): print(f"warning from line {line+1}: {details}")
+
+class CollectOutput(MendOutput):
+    def __init__(self): self.__parts: list[str] = []
+
+    def write(self, text: str): self.__parts.append(text)
+
+    def getvalue(self) -> str: return ''.join(self.__parts)
+
+    def lines(self) -> list[str]: return self.getvalue().splitlines()
+
+    def clear(self): self.__parts.clear()
+
+
+# where runs write to when they aren't given anything else
+default_output: MendOutput = BufferedOutput()
+
+def use_output(output: MendOutput = None, diagnostics: MendOutput = None) -> tuple[MendOutput, MendOutput]:
+    # diagnostics follow the output unless they're given a stream of their own
+    previous = (context.output, context.diagnostics)
+    if output != None: context.output = output
+    if diagnostics != None: context.diagnostics = diagnostics
+    elif output != None: context.diagnostics = output
+    return previous
+
+def restore_output(previous: tuple[MendOutput, MendOutput]):
+    context.output.flush()
+    if context.diagnostics is not context.output: context.diagnostics.flush()
+    context.output, context.diagnostics = previous
+
+
+def log_error(details: str, line: int): context.diagnostics.write(f"error: {details} on line {line+1}\n")
+
+def log_warning(details: str, line: int): context.diagnostics.write(f"warning from line {line+1}: {details}\n")
 
 
 class listgetter_fail: pass
 
-def get_list(toks: list[Token], line, starting_idx: int = 4, return_as_failure = listgetter_fail, call_raf: bool = True):
+def get_list(toks: list[Token], line, starting_idx: int = 4, return_as_failure = listgetter_fail, call_raf: bool = True, nested: bool = False):
+    # nested lists also give back where they ended, so the outer list carries on after their ']'
     c_tok = starting_idx
     acc = []
     looking_for_comma = False
-    while not istoken(toks[c_tok], TT.RBRACKET):
+    while c_tok < len(toks) and not istoken(toks[c_tok], TT.RBRACKET):
         if looking_for_comma:
             if not istoken(toks[c_tok], TT.COMMA): log_error('malformed variable declaration(missing comma)', line); return return_as_failure() if call_raf else return_as_failure
             c_tok += 1
@@ -341,392 +790,2183 @@ def get_list(toks: list[Token], line, starting_idx: int = 4, return_as_failure =
         else:
             if istoken(toks[c_tok], (TT.FLOAT, TT.INT, TT.STRING, TT.BOOL)): acc.append(toks[c_tok].value); looking_for_comma = True; c_tok += 1
             elif istoken(toks[c_tok], TT.LBRACKET):
-                ngotten = get_list(toks, line, c_tok+1, return_as_failure, call_raf)
+                ngotten = get_list(toks, line, c_tok+1, return_as_failure, call_raf, True)
                 if call_raf:
                     if isinstance(ngotten, return_as_failure): return ngotten
                 else:
                     if ngotten == return_as_failure: return ngotten
+                ngotten, c_tok = ngotten
                 acc.append(ngotten)
                 looking_for_comma = True
-                c_tok += 1
             else: log_error(f"malformed variable declaration(invalid type '{toks[c_tok].type}')", line); return return_as_failure() if call_raf else return_as_failure
-    return acc
+    if c_tok == len(toks): log_error("malformed variable declaration(missing ']')", line); return return_as_failure() if call_raf else return_as_failure
+    return (pack_list(acc), c_tok + 1) if nested else pack_list(acc)
 
 
-def get_variable(variable_token: Token, tokens: list[Token], variables: dict[str, Any], constants: ImmutDict, functions: dict[str, tuple[tuple[tuple[tuple[str, bool]], list[Token]]]], line: int, debug: bool = False):
-    if istoken(variable_token, TT.IDENT):
-        not_found_id = f'{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}'
-        from_mutable = variables.get(variable_token.value, not_found_id)
-        if from_mutable == not_found_id:
-            from_immutable = constants.get(variable_token.value, not_found_id)
-            if from_immutable == not_found_id: return TT.ILLEGAL
-            else: return from_immutable
-        else: return from_mutable
-    else: return variable_token.value
+def scrape_funcinputs(arguments: list[Any], scope, funcargs: list[MendFuncArg], line: int) -> list[list[Any, MendFuncArg]]:
+    if len(arguments) > len(funcargs): log_error(f"too many arguments given(expected {len(funcargs)}, but got {len(arguments)} instead)", line); return TT.ILLEGAL
+    required = len(funcargs) if len(arguments) >= len(funcargs) else len([a for a in funcargs if a.isrequired()])
+    if len(arguments) < required: log_error(f"too few arguments given(expected {required}, but got {len(arguments)} instead)", line); return TT.ILLEGAL
+    out = []
+    for i, a in enumerate(arguments):
+        if isinstance(a, Slot):
+            value = scope.slots[a.index]
+            if value is not UNSET: out.append([value, funcargs[i]])
+            elif a.name in scope.funcs: out.append([scope.funcs[a.name].copy(), funcargs[i]])
+            else: log_error(f"(funcinscrape)unknown variable '{a.name}'", line); return TT.ILLEGAL
+        elif isinstance(a, Member):
+            value = resolve_member(a, scope)
+            if value is TT.ILLEGAL: log_error(f"(funcinscrape)unknown variable '{a.name}'", line); return TT.ILLEGAL
+            out.append([value, funcargs[i]])
+        else: out.append([a.value, funcargs[i]])
+        if out[-1][0].__class__ is MendContainer: out[-1][0] = out[-1][0].copy()
+    return out
 
 
-def scrape_funcinputs(tokens: list[Token], vars: dict[str, Any], consts: ImmutDict, funcs: dict[str, MendFunction], funcargs: list[MendFuncArg], line: int) -> list[list[Any, MendFuncArg]]:
+def scrape_callargs(tokens: list[Token], line: int) -> list[Token]:
     out = []
     looking_for_comma = False
-    for i, t in enumerate(tokens):
-        if i in (0, 1, len(tokens)-1): continue
-        i -= 3
-        if i > len(funcargs)-1: log_error(f"too many arguments given(expected {len(funcargs)}, but got {len([tx for tx in tokens if tx.type != TT.COMMA]) - 3} instead)", line); return TT.ILLEGAL
+    for t in tokens:
         if looking_for_comma:
             if not istoken(t, TT.COMMA): log_error("expected comma", line); return TT.ILLEGAL
             looking_for_comma = False
         else:
-            if istoken(t, TT.IDENT):
-                ident = t.value
-                if ident in list(vars): out.append([vars[ident], funcargs[i]])
-                else:
-                    if ident in list(consts.keys()): out.append([consts[ident], funcargs[i]])
-                    else:
-                        if ident in list(funcs): out.append([funcs[ident].copy(), funcargs[i]])
-                        else: log_error(f"(funcinscrape)unknown variable '{ident}'", line); return TT.ILLEGAL
-            elif istoken(t, (TT.BOOL, TT.STRING, TT.INT, TT.FLOAT)): out.append([t.value, funcargs[i]])
-            else: log_error("expected 'identifier', 'string', 'int', 'float', or 'bool', but got '' instead", line); return TT.ILLEGAL
+            if istoken(t, (TT.IDENT, TT.BOOL, TT.STRING, TT.INT, TT.FLOAT)): out.append(t)
+            else: log_error(f"expected 'identifier', 'string', 'int', 'float', or 'bool', but got '{t.type.name}' instead", line); return TT.ILLEGAL
             looking_for_comma = True
+    if len(tokens) > 0 and not looking_for_comma: log_error("expected argument after comma", line); return TT.ILLEGAL
     return out
 
 
 def scrape_funcargs(tokens: list[Token], line: int) -> list[MendFuncArg]:
     out = []
-    for i, t in enumerate(tokens):
-        if i in (0, 1, 2, len(tokens)-1): continue
-        if istoken(t, TT.IDENT): out.append(MendFuncArg(t.value, True))
-        else: return log_error(f"expected identifier, but found '{t}' instead", line); TT.ILLEGAL
+    looking_for_comma = False
+    for t in tokens[3:-1]:
+        if looking_for_comma:
+            if not istoken(t, TT.COMMA): log_error(f"expected comma, but found '{t}' instead", line); return TT.ILLEGAL
+            looking_for_comma = False
+        else:
+            if not istoken(t, TT.IDENT): log_error(f"expected identifier, but found '{t}' instead", line); return TT.ILLEGAL
+            if t.value in [a.getname() for a in out]: log_error(f"duplicate argument '{t.value}'", line); return TT.ILLEGAL
+            out.append(MendFuncArg(t.value, True))
+            looking_for_comma = True
     return out
 
 
-def inject_args(vars: dict[str, Any], funcs: dict[str, MendFunction], fargs: list[list[Any, MendFuncArg]]):
+def inject_args(scope, fargs: list[list[Any, MendFuncArg]]):
     for f in fargs:
         value, mfa = f
-        if isinstance(value, MendFunction): funcs[mfa.getname()] = value
-        vars[mfa.getname()] = value
-    return vars, funcs
+        if isinstance(value, MendFunction): scope.own_funcs()[mfa.getname()] = value
+        scope.bind(mfa.getname(), value)
+    return scope
+
+
+class ModuleRegistry:
+    # every imported file by its resolved path along with what it exported, so a file only runs once however many files import it
+    def __init__(self, fixed: bool = False):
+        # path -> (the code that ran, its exports, {path: code} of every file it imported, directly or not)
+        self.modules: dict[str, tuple[Any, tuple, dict[str, Any]]] = {}
+        # the files running right now and what they've imported so far, innermost last; importing one of them again is a cycle
+        self.loading: list[tuple[str, dict[str, Any]]] = []
+        # a bundle's files can't change while it runs, so what they imported doesn't have to be checked
+        self.fixed = fixed
+        self.stats = {'ran': 0, 'reused': 0}
+
+    def find(self, key: str, code: Any) -> tuple:
+        # -> the exports of the module if it already ran as this code and nothing it imported has changed since, otherwise None
+        entry = self.modules.get(key)
+        if entry == None or entry[0] is not code: return None
+        if not self.fixed:
+            for path, was in entry[2].items():
+                source = Path(path)
+                try:
+                    if find_compiled(source, compile_key(source)) is not was: return None
+                except OSError: return None
+        return entry[1]
+
+    def cycle(self, key: str) -> list[str]:
+        # -> the files that import each other, starting and ending with key, or None if importing it isn't a cycle
+        chain = [k for k, _ in self.loading]
+        return chain[chain.index(key):] + [key] if key in chain else None
+
+    def forget(self, path: str | Path) -> int:
+        # drops the module and every module that imported it, so they all run again the next time they're imported, -> how many were dropped
+        key = str(Path(path).resolve())
+        dropped = [k for k, entry in self.modules.items() if k == key or key in entry[2]]
+        for k in dropped: self.modules.pop(k)
+        return len(dropped)
+
+    def clear(self): self.modules.clear()
+
+
+class RunContext(threading.local):
+    # everything a run reads from module level(where it writes, where 'get' reads from, its imports, limits, profiler and bundle)
+    # kept per thread, so interpreters used from several threads at once never see each other's runs
+    def __init__(self):
+        self.output: MendOutput = default_output
+        self.diagnostics: MendOutput = default_output
+        # None for the terminal, or a function taking the prompt that returns the text, or None if there's none yet
+        self.input_source = None
+        # only for code executed on its own, every top-level run and every Interpreter has a registry of its own
+        self.registry = ModuleRegistry()
+        self.limits: RunLimits = None
+        self.profiler: MendProfiler = None
+        # set while a bundle runs, every import is looked up in it instead of the file system
+        self.bundle: MendBundle = None
+
+context = RunContext()
+
+def use_registry(registry: ModuleRegistry) -> ModuleRegistry:
+    previous = context.registry
+    context.registry = registry
+    return previous
+
+
+def import_mend_file(root_folder: str, import_path: str, scope, code: Any = None):
+    path = Path(root_folder, import_path)
+    key = str(path.resolve())
+    registry = context.registry
+    cycle = registry.cycle(key)
+    if cycle != None:
+        shown = [os.path.relpath(k) if not os.path.relpath(k).startswith('..') else k for k in cycle]
+        context.diagnostics.write(f"error: import cycle({' -> '.join(shown)})\n"); return FullReturn()
+    prof = context.profiler
+    if prof != None: prof.push(f'import {path}', key)
+    try:
+        if code == None: code = load_compiled(path)
+        imported = code if isinstance(code, FullReturn) else registry.find(key, code)
+        if imported == None:
+            registry.loading.append((key, {}))
+            try: imported = execute(code, isimported=True)
+            finally: imports = registry.loading.pop()[1]
+            if not isinstance(imported, FullReturn): registry.modules[key] = (code, imported, imports); registry.stats['ran'] += 1
+        elif not isinstance(imported, FullReturn): registry.stats['reused'] += 1
+    finally:
+        if prof != None: prof.pop(prof.imports, str(path))
+    #print(imported)
+    if isinstance(imported, FullReturn): return FullReturn()
+    # whatever is importing this file depends on it and on everything it imported
+    if len(registry.loading) > 0:
+        importer = registry.loading[-1][1]
+        importer[key] = code
+        importer.update(registry.modules[key][2])
+    if imported != None: scope.merge(*imported)
+    return imported
 
 
-def import_mend_file(root_folder: str, import_path: str, vars: dict[str, Any], consts: ImmutDict, funcs: dict[str, MendFunction]):
-    with open(Path(root_folder, import_path), 'rt') as imp_file:
-        imported = interpret([[t for t in LineLexer(l).lex_to_tokens() if t.type != TT.COMMENT] for l in imp_file.read().split('\n')], isimported=True)
-        #print(imported)
-        if isinstance(imported, FullReturn): return FullReturn()
-        if imported != None:
-            vars = extend_dict(vars, imported[0], True)
-            consts.extend(imported[1])
-            funcs = extend_dict(funcs, imported[2], True)
-    return vars, consts, funcs
-
-
-def record_until_endtoken(token_lines: list[list[Token]], starting_idx: int) -> list[list[Token]]:
-    ln = starting_idx
-    #, keyword: str
-    uses_end = [
-        'func',
-        'repeat'
-    ]
-    '''
-    if keyword not in uses_end:
-        temp = uses_end.pop()
-        temp_joined = ', '.join([f"'{u}'" for u in uses_end])
-        raise Exception(f"(record_until_endtoken) expected {temp_joined}, or '{temp}' as keyword, but got '{keyword}' instead")
-    '''
-    out = []
-    nest = 0
-    while ln < len(token_lines):
-        #print(ln, token_lines[ln], nest)
-        if len(token_lines[ln]) > 0:
-            if istoken(token_lines[ln][0], TT.KEYWORD, 'end'):
-                if nest == 0: break
-                else: out.append(token_lines[ln]); nest -= 1
-            else:
-                if istoken(token_lines[ln][0], TT.KEYWORD, tuple(uses_end)): nest += 1
-                out.append(token_lines[ln]); ln += 1
-        else: ln += 1
-    return out, ln
+class Null:
+    def __bool__(self): return False
 
+    def __eq__(self, other): return isinstance(other, Null)
+
+    def __hash__(self): return hash(None)
 
-class Null:
     def __repr__(self): return 'null'
 
 class FullReturn: pass
 
-def interpret(token_lines: list[list[Token]], isfunc: bool = False, funcargs: list[list[Any, MendFuncArg]] = [], isimported: bool = False, root_folder: str = ''):
-    # flags
-    jump_to_next_end = False
+class Unset:
+    def __repr__(self): return 'unset'
 
-    vars: dict[str, Any] = {}
-    consts: ImmutDict = ImmutDict()
-    '''
-    'Yell': MendFunction(
-            'Yell',
-            [],
-            [
-                [
-                    Token(TT.KEYWORD, 'log'), Token(TT.STRING, 'A' + ('H' * 50))
-                ]
-            ],
-            True
-        )
-    '''
-    funcs: dict[str, MendFunction] = {}
-    if len(funcargs) > 0: vars = inject_args(vars, funcargs)
+UNSET = Unset()
 
-    containers: dict[str, MendContainer] = {}
+class MendReturn:
+    def __init__(self, value: Any = None): self.value = value
 
-    #print(funcs)
 
-    #print(vars, isfunc)
 
-    ignore_warnings = 0
+class OP(Enum):
+    STOP = 'STOP'
+    IMPORT = 'IMPORT'
+    LOG = 'LOG'
+    GET = 'GET'
+    IF = 'IF'
+    MUT = 'MUT'
+    IMMUT = 'IMMUT'
+    SET = 'SET'
+    RETURN = 'RETURN'
+    REPEAT = 'REPEAT'
+    FUNC = 'FUNC'
+    CALL = 'CALL'
+    NAME = 'NAME'
+    CONTAINER = 'CONTAINER'
+
+
+class Instr:
+    def __init__(self, op: OP, operands: list[Any], line: int, debug: bool = False, quiet: bool = False, body: list = None, orelse: list = None):
+        self.op = op
+        self.operands = operands
+        self.line = line
+        self.debug = debug
+        self.quiet = quiet
+        self.body = body
+        self.orelse = orelse
 
-    ln = 0
-    while ln < len(token_lines):
-        print_debug = False
+    def __repr__(self):
+        out = f'{self.op.value}{self.operands}'
+        if self.body != None: out += '{' + ', '.join([str(i) for i in self.body]) + '}'
+        if self.orelse != None: out += ' else {' + ', '.join([str(i) for i in self.orelse]) + '}'
+        return out
+
+
+
+class Slot:
+    def __init__(self, index: int, name: str):
+        self.index = index
+        self.name = name
+
+    def __repr__(self): return f'{self.name}#{self.index}'
+
+
+class Member:
+    # 'a.b.c', the slot of the container 'a' and the names after it; the (layout, index) the last lookup found is kept for as long as the container's layout doesn't change
+    # it's one tuple so threads sharing the compiled code always see a layout together with its own index
+    __slots__ = ('slot', 'names', 'name', 'cache')
+
+    def __init__(self, slot: Slot, names: tuple[str], name: str):
+        self.slot = slot
+        self.names = names
+        self.name = name
+        self.cache: tuple[ContainerLayout, int] = (None, -1)
+
+    def __getstate__(self): return (self.slot, self.names, self.name)
+
+    def __setstate__(self, state): self.slot, self.names, self.name = state; self.cache = (None, -1)
+
+    def __repr__(self): return f"{self.slot}.{'.'.join(self.names)}"
+
+
+class SlotTable:
+    # names of a file or function body resolved to fixed indexes at compile time
+    def __init__(self, names: list[str] = []):
+        self.names: dict[str, int] = {}
+        self.immut: set[int] = set()
+        # values of top-level 'immut' declarations of a literal, which expressions fold in place of the name
+        self.consts: dict[int, Any] = {}
+        for n in names: self.slot(n)
+
+    def slot(self, name: str) -> Slot:
+        index = self.names.get(name)
+        if index == None: index = len(self.names); self.names[name] = index
+        return Slot(index, name)
+
+    def member(self, name: str) -> Member:
+        names = name.split('.')
+        return Member(self.slot(names[0]), tuple(names[1:]), name)
+
+    def copy(self):
+        table = SlotTable()
+        table.names = dict(self.names)
+        table.immut = set(self.immut)
+        table.consts = dict(self.consts)
+        return table
+
+    # what compiling a line that uses the name depends on, the constant's class is there so 1 and 1.0 don't count as the same
+    def state(self, index: int) -> tuple[bool, type, Any]:
+        value = self.consts.get(index, UNSET)
+        return index in self.immut, value.__class__, value
+
+    def restore(self, index: int, state: tuple[bool, type, Any]):
+        if state[0]: self.immut.add(index)
+        else: self.immut.discard(index)
+        if state[2] is UNSET: self.consts.pop(index, None)
+        else: self.consts[index] = state[2]
+
+    def __len__(self): return len(self.names)
+
+    def __repr__(self): return str(self.names)
+
+
+class MendCode:
+    def __init__(self, instrs: list[Instr], table: SlotTable, source: str = '<string>', name: str = ''):
+        self.instrs = instrs
+        self.table = table
+        self.source = source
+        self.name = name
+        # (line, details) of the warnings the optimizer found, reported once before the code runs
+        self.warnings: list[tuple[int, str]] = []
+
+    def __len__(self): return len(self.instrs)
+
+    def __repr__(self): return str(self.instrs)
+
+
+
+VALUE_TYPES = (TT.FLOAT, TT.INT, TT.STRING, TT.BOOL)
+# lowest to highest, every level is left associative
+EXPR_PRECEDENCE = (('or',), ('and',), ('is', 'isnot', 'not'), ('less', 'more'), ('plus', 'minus'), ('mult', 'div', 'fdiv'))
+EXPR_OPS = tuple([op for ops in EXPR_PRECEDENCE for op in ops])
+
+
+class Const:
+    # a value known at compile time, a literal or whatever a part of an expression made only of literals and constants folded to
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any): self.value = value
+
+    def __repr__(self): return repr(self.value)
+
+
+class Expr:
+    # one operation of a precompiled expression, its sides are Exprs, Slots or Consts
+    __slots__ = ('op', 'left', 'right')
+
+    def __init__(self, op: str, left: Any, right: Any):
+        self.op = op
+        self.left = left
+        self.right = right
+
+    def __repr__(self):
+        chain, node = [], self
+        while node.__class__ is Expr: chain.append(node); node = node.left
+        out = repr(node)
+        for n in reversed(chain): out = f'({out} {n.op} {n.right!r})'
+        return out
+
+    def __reduce__(self):
+        # pickled as a flat list of links for the same reason, a nested one would run out of stack in the .mendc cache
+        chain, node = [], self
+        while node.__class__ is Expr: chain.append(node); node = node.left
+        return (build_chain, (node, [(n.op, n.right) for n in reversed(chain)]))
+
+
+def build_chain(first: Any, links: list[tuple[str, Any]]):
+    for op, right in links: first = Expr(op, first, right)
+    return first
+
+
+# folded values bigger than this are left for runtime, code that never runs shouldn't build them
+FOLD_SIZE_LIMIT = 4096
+
+def fold(op: str, left: Any, right: Any):
+    if left.__class__ is not Const or right.__class__ is not Const: return Expr(op, left, right)
+    if projected_size(op, left.value, right.value) > FOLD_SIZE_LIMIT: return Expr(op, left, right)
+    try: return Const(apply_op(op, left.value, right.value))
+    # left for runtime, so the error is reported when(and if) the line actually runs
+    except (ValueError, TypeError, ArithmeticError): return Expr(op, left, right)
+
+
+def parse_expression(toks: list[Token], pos: int, level: int, ln: int, table: SlotTable):
+    # -> (node, position after it) or FullReturn
+    if level == len(EXPR_PRECEDENCE): return parse_operand(toks, pos, ln, table)
+    parsed = parse_expression(toks, pos, level + 1, ln, table)
+    if isinstance(parsed, FullReturn): return FullReturn()
+    left, pos = parsed
+    while pos < len(toks) and istoken(toks[pos], (TT.KEYWORD, TT.IDENT), EXPR_PRECEDENCE[level]):
+        op = toks[pos].value
+        if pos + 1 == len(toks): log_error(f"malformed expression(missing value after '{op}')", ln); return FullReturn()
+        parsed = parse_expression(toks, pos + 1, level + 1, ln, table)
+        if isinstance(parsed, FullReturn): return FullReturn()
+        right, pos = parsed
+        left = fold(op, left, right)
+    return left, pos
+
+
+def parse_operand(toks: list[Token], pos: int, ln: int, table: SlotTable):
+    tok = toks[pos]
+    if istoken(tok, TT.LPAREN):
+        if pos + 1 == len(toks): log_error("malformed expression(missing ')')", ln); return FullReturn()
+        parsed = parse_expression(toks, pos + 1, 0, ln, table)
+        if isinstance(parsed, FullReturn): return FullReturn()
+        node, pos = parsed
+        if pos >= len(toks) or not istoken(toks[pos], TT.RPAREN): log_error("malformed expression(missing ')')", ln); return FullReturn()
+        return node, pos + 1
+    if istoken(tok, VALUE_TYPES): return Const(tok.value), pos + 1
+    if istoken(tok, TT.IDENT):
+        if pos + 1 < len(toks) and istoken(toks[pos + 1], TT.LPAREN): log_error(f"malformed expression(function calls like '{tok.value}' can't be part of an expression)", ln); return FullReturn()
+        if '.' in tok.value: return table.member(tok.value), pos + 1
+        slot = table.slot(tok.value)
+        if slot.index in table.consts: return Const(table.consts[slot.index]), pos + 1
+        return slot, pos + 1
+    log_error(f"malformed expression(expected a value, but got '{tok.value if tok.value != None else tok.type.name}' instead)", ln); return FullReturn()
+
+
+def compile_expression(toks: list[Token], ln: int, table: SlotTable):
+    # -> a Const, Slot or Expr tree for '[value] [operator] [value] ...' or FullReturn
+    if len(toks) == 0: log_error("malformed expression(missing value)", ln); return FullReturn()
+    # every '(' goes a few calls deeper, so only parentheses nested hundreds deep can get here
+    try: parsed = parse_expression(toks, 0, 0, ln, table)
+    except RecursionError: log_error("malformed expression(parentheses nested too deeply)", ln); return FullReturn()
+    if isinstance(parsed, FullReturn): return FullReturn()
+    node, pos = parsed
+    if pos < len(toks): log_error(f"malformed expression(unexpected '{toks[pos].value if toks[pos].value != None else toks[pos].type.name}')", ln); return FullReturn()
+    return node
+
+
+def evaluate(node: Any, scope, ln: int):
+    cls = node.__class__
+    if cls is Slot:
+        value = scope.slots[node.index]
+        if value is UNSET: log_error(f"unknown variable '{node.name}'", ln); return FullReturn()
+        return value
+    if cls is Const: return node.value
+    if cls is Member:
+        value = resolve_member(node, scope)
+        if value is TT.ILLEGAL: log_error(f"unknown variable '{node.name}'", ln); return FullReturn()
+        return value
+    # a chain like 'a plus b plus c' nests on its left side, which is walked in a loop so a long chain can't run out of Python's stack
+    chain = []
+    while cls is Expr:
+        chain.append(node)
+        node = node.left
+        cls = node.__class__
+    value = evaluate(node, scope, ln)
+    if value.__class__ is FullReturn: return value
+    for node in reversed(chain):
+        op = node.op
+        # 'and' and 'or' only look at their right side when they need to
+        if op == 'and' and not value: value = False; continue
+        if op == 'or' and value: value = True; continue
+        right = evaluate(node.right, scope, ln)
+        if right.__class__ is FullReturn: return right
+        if op == 'mult' or op == 'plus':
+            limits = context.limits
+            if limits != None and limits.max_memory_items != None and not limits.room(projected_size(op, value, right), ln): return FullReturn()
+        try: value = apply_op(op, value, right)
+        except (ValueError, TypeError, ArithmeticError) as e: log_error(e, ln); return FullReturn()
+    return value
+
+def compile_declaration(toks: list[Token], ln: int):
+    # -> (name, (kind, payload)) where kind is 'null', 'value', 'var', 'list', 'call' or 'expr'(the payload is still tokens)
+    if len(toks) == 2:
+        if istoken(toks[1], TT.IDENT): return toks[1].value, ('null', None)
+        log_error('malformed variable declaration(missing variable name)', ln); return FullReturn()
+    elif len(toks) >= 4:
+        if not (istoken(toks[1], TT.IDENT) and istoken(toks[2], TT.KEYWORD, 'as')): log_error(f"malformed variable declaration(missing variable name and 'as' keyword)", ln); return FullReturn()
+        if len(toks) > 4 and not istoken(toks[3], TT.LBRACKET) and not (istoken(toks[3], TT.IDENT) and istoken(toks[4], TT.LPAREN)): return toks[1].value, ('expr', toks[3:])
+        if istoken(toks[3], VALUE_TYPES): return toks[1].value, ('value', toks[3].value)
+        elif istoken(toks[3], TT.KEYWORD): log_error(f"malformed variable declaration(invalid keyword '{toks[3].value}')", ln); return FullReturn()
+        elif istoken(toks[3], TT.IDENT):
+            if len(toks) == 4: return toks[1].value, ('var', toks[3].value)
+            if not (len(toks) >= 6 and istoken(toks[4], TT.LPAREN) and istoken(toks[-1], TT.RPAREN)): log_error("malformed variable declaration(expected a value or a function call after 'as')", ln); return FullReturn()
+            args = scrape_callargs(toks[5:-1], ln)
+            if args is TT.ILLEGAL: return FullReturn()
+            return toks[1].value, ('call', (toks[3].value, args))
+        elif istoken(toks[3], TT.LBRACKET):
+            ls = get_list(toks, ln)
+            if isinstance(ls, listgetter_fail): return FullReturn()
+            return toks[1].value, ('list', ls)
+        log_error(f"malformed variable declaration(invalid value '{toks[3].value}')", ln); return FullReturn()
+    log_error('malformed variable declaration(missing variable name)', ln); return FullReturn()
+
+
+def compile_condition(toks: list[Token], ln: int):
+    if not istoken(toks[-1], TT.KEYWORD, 'then'): log_error("missing 'then' to close 'if'", ln); return FullReturn()
+    if len(toks) == 2: log_error("malformed if statement(expected a condition before 'then')", ln); return FullReturn()
+    return toks[1:-1]
+
+
+BLOCK_OPENERS = ('func', 'repeat', 'if', 'container')
+
+def match_blocks(token_lines: list[list[Token]]) -> tuple[dict[int, int], dict[int, int]]:
+    # one pass over the file, mapping every block opener's line to its matching 'end' line and every 'if' to its 'else'
+    ends: dict[int, int] = {}
+    elses: dict[int, int] = {}
+    openers: list[int] = []
+    for ln, toks in enumerate(token_lines):
+        if len(toks) < 1 or not istoken(toks[0], TT.KEYWORD): continue
+        kw = toks[0].value
+        if kw in BLOCK_OPENERS: openers.append(ln)
+        elif kw == 'end':
+            if len(openers) > 0: ends[openers.pop()] = ln
+        elif kw == 'else':
+            if len(openers) > 0 and istoken(token_lines[openers[-1]][0], value='if') and openers[-1] not in elses: elses[openers[-1]] = ln
+    return ends, elses
+
+
+def declared_slots(code: list[Instr]) -> tuple[int]:
+    out = []
+    for instr in code:
+        if instr.op in (OP.MUT, OP.IMMUT, OP.CONTAINER): out.append(instr.operands[0].index)
+        # a bare 'get x' only sets x, 'get mut x' and 'get immut x' declare it
+        elif instr.op == OP.GET and instr.operands[1] != 'set': out.append(instr.operands[0].index)
+        elif instr.op == OP.CALL and instr.operands[2] != None and instr.operands[2].op != OP.SET: out.append(instr.operands[2].operands[0].index)
+        elif instr.op in (OP.IF, OP.REPEAT):
+            out.extend(declared_slots(instr.body))
+            if instr.orelse != None: out.extend(declared_slots(instr.orelse))
+    return tuple(set(out))
+
+
+IMPURE_OPS = {
+    OP.LOG: "use 'log'",
+    OP.GET: "use 'get'",
+    OP.IMPORT: "use 'import'",
+}
+
+def find_impure(code: list[Instr]) -> Instr:
+    for instr in code:
+        if instr.op in IMPURE_OPS: return instr
+        if instr.op in (OP.IF, OP.REPEAT, OP.CONTAINER):
+            found = find_impure(instr.body) if instr.orelse == None else find_impure(instr.body + instr.orelse)
+            if found != None: return found
+    return None
+
+
+def operand(tok: Token, table: SlotTable):
+    if not istoken(tok, TT.IDENT): return tok
+    return table.member(tok.value) if '.' in tok.value else table.slot(tok.value)
+
+
+def callee(name: str, table: SlotTable):
+    # 'config.f()' calls a function that's a member of a container
+    return table.member(name) if '.' in name else name
+
+
+def join_paths(toks: list[Token], ln: int) -> list[Token]:
+    # 'a.b.c' comes out of the lexer as names and periods, here it's put back together into one name
+    if not any([t.type is TT.PERIOD for t in toks]): return toks
+    out = []
+    i = 0
+    while i < len(toks):
+        t = toks[i]
+        if istoken(t, TT.PERIOD):
+            if len(out) == 0 or not istoken(out[-1], TT.IDENT) or i + 1 == len(toks) or not istoken(toks[i+1], TT.IDENT): log_error("malformed name(a '.' has to be between two names)", ln); return FullReturn()
+            out[-1] = Token(TT.IDENT, f'{out[-1].value}.{toks[i+1].value}')
+            i += 2
+            continue
+        out.append(t)
+        i += 1
+    return out
+
+
+def describe_token(tok: Token) -> str: return f"'{tok.value}'" if tok.value != None else tok.type.name
+
+
+def compile_lines(token_lines: list[list[Token]], start: int = 0, stop: int = None, isfunc: bool = False, blocks: tuple[dict[int, int], dict[int, int]] = None, table: SlotTable = None, toplevel: bool = True) -> list[Instr]:
+    if stop == None: stop = len(token_lines)
+    if blocks == None: blocks = match_blocks(token_lines)
+    if table == None: table = SlotTable()
+    ends, elses = blocks
+    code: list[Instr] = []
+    ignore_warnings = False
+
+    ln = start
+    while ln < stop:
         toks = token_lines[ln]
-        
         if len(toks) < 1: ln += 1; continue
-        else:
-            #print(toks)
-            if jump_to_next_end:
-                if istoken(toks[0], TT.KEYWORD, 'end'): jump_to_next_end = False
-                ln += 1
-                continue
-            for t in toks:
-                if istoken(t, TT.ILLEGAL):
-                    err = f"illegal character '{t.value[0]}'" if isinstance(t.value, (tuple, list)) else f"illegal character '{t.value}'"
-                    if len(t.value) > 1 and isinstance(t.value, (tuple, list)): err += f'({t.value[1]})'
-                    log_error(err, ln)
-                    return FullReturn()
-            
-            #print(toks, funcs, istoken(toks[0], value=tuple(funcs.keys())), "\n")
-            
-            if istoken(toks[-1], TT.DEBUG):
-                print_debug = True
-                del toks[-1]
-                if len(toks) < 1: ln += 1; continue
-
-            if istoken(toks[0], TT.KEYWORD):
-                if istoken(toks[0], value='stop'): return TT.STOP
-
-                if istoken(toks[0], value='import'):
-                    if len(toks) < 2: log_error("malformed import(missing item to import)", ln); return FullReturn()
-                    if istoken(toks[1], (TT.STRING, TT.IDENT)):
-                        tok_value = toks[1].value
-                        if istoken(toks[1], TT.IDENT):
-                            var_result = get_variable(toks[1], toks, vars, consts, funcs, ln)
-                            if var_result == TT.ILLEGAL: log_error(f"unknown variable '{toks[1].value}'", ln); return FullReturn()
-                            if not isinstance(var_result, str): log_error(f"expected 'string', but got '{var_result}' of type {type(var_result).__name__} instead", ln); return FullReturn()
-                            tok_value = var_result
-                        import_path = tok_value
-                        if not Path(root_folder, import_path).exists():
-                            import_path += '.mend'
-                            if not Path(root_folder, import_path).exists():
-                                log_error(f"malformed import(path '{import_path}' doesn't exist)", ln)
-                                #if print_debug: print([str(p) for p in Path('./').iterdir()])
-                                return FullReturn()
-                        try:
-                            if Path(root_folder, import_path).is_dir():
-                                for f in Path(root_folder, import_path).iterdir():
-                                    if not str(f).endswith('.mend'): continue
-                                    if print_debug: print(f"imported '{str(f)}'")
-                                    imported = import_mend_file(str(f).split('/', 1)[0], str(f).split('/', 1)[1], vars, consts, funcs)
-                                    if isinstance(imported, FullReturn): return FullReturn()
-                                    vars, consts, funcs = imported
-                            else:
-                                imported = import_mend_file(root_folder, import_path, vars, consts, funcs)
-                                if isinstance(imported, FullReturn): return FullReturn()
-                                if print_debug: print(f"imported '{str(Path(root_folder, import_path))}'")
-                                vars, consts, funcs = imported
-                        except Exception as e: log_error(f"malformed import({e})", ln); return FullReturn()
-                    else: log_error(f"malformed import(invalid import item '{toks[1].type}')", ln); return FullReturn()
-
-                elif istoken(toks[0], value='log'):
-                    var_result = get_variable(toks[1], toks, vars, consts, funcs, ln)
-                    if var_result == TT.ILLEGAL: log_error(f"could not log unknown variable '{toks[1].value}'", ln); return FullReturn()
-                    print(var_result)
-                
-                elif istoken(toks[0], value='get'):
-                    if len(toks) == 2:
-                        if istoken(toks[1], TT.IDENT):
-                            uinp = input('give input\n')
-                            vars[toks[1].value] = uinp
-                    elif len(toks) > 2:
-                        if istoken(toks[1], TT.KEYWORD) and istoken(toks[2], TT.IDENT):
-                            match toks[1].value:
-                                case 'mut':
-                                    uinp = input('give input\n')
-                                    vars[toks[1].value] = uinp
-                                case 'immut':
-                                    uinp = input('give input\n')
-                                    vars[toks[1].value] = uinp
-                                case default:
-                                    log_error(f"malformed get statement(invalid keyword '{toks[1].value}')", ln); return FullReturn()
-                    else:
-                        log_error(f"malformed get statement(expected 'mut [variable name]', 'immut [variable name]', or '[variable name]')", ln); return FullReturn()
-                
-                elif istoken(toks[0], value='if'):
-                    if not istoken(toks[-1], TT.KEYWORD, 'then'):
-                        log_error("missing 'then' to close 'if'", ln)
-                        return FullReturn()
-                
-                elif istoken(toks[0], value='mut'):
-                    if len(toks) == 2:
-                        if istoken(toks[1], TT.IDENT):
-                            if istoken(toks[1], value=tuple(vars.keys())): log_error(f"can't declare variable '{toks[1].value}', already exists", ln); return FullReturn()
-                            vars[toks[1].value] = Null()
-                        else: log_error('malformed variable declaration(missing variable name)', ln); return FullReturn()
-                    elif len(toks) >= 4:
-                        if istoken(toks[1], TT.IDENT) and istoken(toks[2], TT.KEYWORD, 'as'):
-                            if istoken(toks[1], value=tuple(vars.keys())): log_error(f"can't declare variable '{toks[1].value}', already exists", ln); return FullReturn()
-                            if istoken(toks[3], (TT.FLOAT, TT.INT, TT.STRING, TT.BOOL)): vars[toks[1].value] = toks[3].value
-                            elif istoken(toks[3], TT.KEYWORD):
-                                log_error(f"malformed variable declaration(invalid keyword '{toks[3].value}')", ln); return FullReturn()
-                            elif istoken(toks[3], TT.IDENT):
-                                not_found_id = f'{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}'
-                                from_mutable = vars.get(toks[1].value, not_found_id)
-                                if from_mutable == not_found_id:
-                                    from_immutable = consts.get(toks[1].value, not_found_id)
-                                    if from_immutable == not_found_id:
-                                        log_error(f"malformed variable declaration(unknown variable '{toks[1].value}')", ln); return FullReturn()
-                                    else: vars[toks[1].value] = from_immutable
-                                else: vars[toks[1].value] = from_mutable
-                            elif istoken(toks[3], TT.LBRACKET):
-                                ls = get_list(toks, ln)
-                                if isinstance(ls, listgetter_fail): return
-                                vars[toks[1].value] = ls
-                            else: log_error(f"malformed variable declaration(invalid value '{toks[3].value}')", ln); return FullReturn()
-                        else: log_error(f"malformed variable declaration(missing variable name and 'as' keyword)", ln); return FullReturn()
-                    else: log_error('malformed variable declaration(missing variable name)', ln); return FullReturn()
-                
-                elif istoken(toks[0], value='immut'):
-                    if len(toks) == 2:
-                        if istoken(toks[1], TT.IDENT):
-                            if istoken(toks[1], value=tuple(consts.keys())): log_error(f"can't declare variable '{toks[1].value}', already exists", ln); return FullReturn()
-                            consts.add(toks[1].value, Null())
-                        else: log_error('malformed variable declaration(missing variable name)', ln); return FullReturn()
-                    elif len(toks) >= 4:
-                        if istoken(toks[1], TT.IDENT) and istoken(toks[2], TT.KEYWORD, 'as'):
-                            if istoken(toks[1], value=tuple(consts.keys())): log_error(f"can't declare variable '{toks[1].value}', already exists", ln); return FullReturn()
-                            if istoken(toks[3], (TT.FLOAT, TT.INT, TT.STRING, TT.BOOL)): consts.add(toks[1].value, toks[3].value)
-                            elif istoken(toks[3], TT.KEYWORD):
-                                log_error(f"malformed variable declaration(invalid keyword '{toks[3].value}')", ln); return FullReturn()
-                            elif istoken(toks[3], TT.IDENT):
-                                not_found_id = f'{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}'
-                                from_mutable = consts.get(toks[1].value, not_found_id)
-                                if from_mutable == not_found_id:
-                                    from_immutable = consts.get(toks[1].value, not_found_id)
-                                    if from_immutable == not_found_id:
-                                        log_error(f"malformed variable declaration(unknown variable '{toks[1].value}')", ln); return FullReturn()
-                                    else: consts.add(toks[1].value, from_immutable)
-                                else: consts.add(toks[1].value, from_mutable)
-                            elif istoken(toks[3], TT.LBRACKET):
-                                ls = get_list(toks, ln)
-                                if isinstance(ls, listgetter_fail): return
-                                consts.add(toks[1].value, ls)
-                            else: log_error(f"malformed variable declaration(invalid value '{toks[3].value}')", ln); return FullReturn()
-                        else: log_error(f"malformed variable declaration(missing variable name and 'as' keyword)", ln); return FullReturn()
-                    else: log_error('malformed variable declaration(missing variable name)', ln); return FullReturn()
-                
-                elif istoken(toks[0], value='set'): pass
-
-                elif istoken(toks[0], value='return'):
-                    if isfunc:
-                        if len(toks) == 1: return
-                        else:
-                            if istoken(toks[1], TT.IDENT):
-                                about_to_return = get_variable(toks[1])
-                                if about_to_return == TT.ILLEGAL: log_error(f"unknown variable '{toks[1].value}'", ln); return FullReturn()
-                                return about_to_return
-                            else: log_error(f"invalid type for return '{toks[1].type}'", ln); return FullReturn()
-                    else: log_error("invalid 'return'", ln); return FullReturn()
-                
-                elif istoken(toks[0], value='repeat'):
-                    amount = 0
-                    repeated, ln = record_until_endtoken(token_lines, ln+1)
-                    ln += 1 # needed or the current line will be the loop's end token
-                    if len(toks) >= 2:
-                        if istoken(toks[1], (TT.IDENT)):
-                            not_found_id = f'{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}{randint(0, 9)}'
-                            from_mutable = vars.get(toks[1].value, not_found_id)
-                            if from_mutable == not_found_id:
-                                from_immutable = consts.get(toks[1].value, not_found_id)
-                                if from_immutable == not_found_id: log_error(f"unknown variable '{toks[1].value}'", ln); return FullReturn()
-                                else: amount = from_immutable
-                            else: amount = from_mutable
-                        elif istoken(toks[1], (TT.INT)): amount = toks[1].value
-                        else: log_error(f"malformed repeat(invalid repeat amount {toks[1].type})", ln); return FullReturn()
-                    else: log_error('malformed repeat(amount not given)', ln); return FullReturn()
-                    for _ in range(amount):
-                        iter_result = interpret(repeated)
-                        if isinstance(iter_result, FullReturn): return FullReturn()
-                        if iter_result == TT.STOP: break
-                
-                elif istoken(toks[0], value='func'):
-                    if len(toks) >= 3:
-                        if istoken(toks[1], TT.IDENT):
-                            is_a_builtin_func = False
-                            if len(toks) >= 5:
-                                if istoken(toks[-1], TT.STATELABEL, 'builtin'):
-                                    del toks[-1]
-                                    is_a_builtin_func = True
-                            if istoken(toks[2], TT.LPAREN) and istoken(toks[-1], TT.RPAREN):
-                                funcname = toks[1].value
-                                function_contents, ln = record_until_endtoken(token_lines, ln+1)
-                                #print(function_contents)
-                                ln += 1 # needed or the current line will be the function's end token
-                                if funcname in list(funcs) and ignore_warnings == 0:
-                                    if funcs[funcname].isbuiltin(): log_warning(f"declaration of function '{funcname}' is overriding a builtin function, did you mean to do this?(to stop this warning, add '@ignorewarning' on the line before)", ln)
-                                    else: log_warning(f"declaration of function '{funcname}' is overriding a previous function, did you mean to do this?(to stop this warning, add '@ignorewarning' on the line before)", ln)
-                                if len(toks) > 4: gotten_args = scrape_funcargs(toks, ln)
-                                else: gotten_args = []
-                                funcs[funcname] = MendFunction(funcname, gotten_args, function_contents, is_a_builtin_func)
-                            else: log_error("malformed function declaration(missing parentheses)", ln); return FullReturn()
-                        else: log_error("malformed function declaration(missing function name)", ln); return FullReturn()
-                    else: log_error("malformed function declaration(missing function name and parentheses)", ln); return FullReturn()
-
-            elif istoken(toks[0], TT.IDENT):
-                if istoken(toks[0], value=tuple(funcs.keys())):
-                    if len(toks) >= 3:
-                        if istoken(toks[1], TT.LPAREN) and istoken(toks[-1], TT.RPAREN):
-                            gottenfunction = funcs[toks[0].value]
-                            if len(toks) > 3: gotten_inputs = scrape_funcinputs(toks, vars, consts, funcs, gottenfunction.get_args(), ln)
-                            else: gotten_inputs = []
-                            if gotten_inputs == TT.ILLEGAL: return FullReturn()
-                            if print_debug: print('running function:'); print(gottenfunction); print('with inputs:'); print(gotten_inputs)
-                            returned = gottenfunction.run(root_folder, gotten_inputs)
-                            if isinstance(returned, FullReturn): return FullReturn()
-                            if returned != None: pass
-                        else: log_error("malformed function call(missing parentheses)", ln); return FullReturn()
-                    elif len(toks) != 1: log_error("malformed function call", ln); return FullReturn()
-                elif istoken(toks[0], value=tuple(vars)) or istoken(toks[0], value=tuple(consts.keys())):
-                    if ignore_warnings == 0: log_warning(f"unused variable '{toks[0].value}'", ln)
+
+        for t in toks:
+            if istoken(t, TT.ILLEGAL):
+                err = f"illegal character '{t.value[0]}'" if isinstance(t.value, (tuple, list)) else f"illegal character '{t.value}'"
+                if len(t.value) > 1 and isinstance(t.value, (tuple, list)): err += f'({t.value[1]})'
+                log_error(err, ln)
+                return FullReturn()
+        toks = join_paths(toks, ln)
+        if isinstance(toks, FullReturn): return FullReturn()
+
+        debug = False
+        if istoken(toks[-1], TT.DEBUG):
+            debug = True
+            toks = toks[:-1]
+            if len(toks) < 1: ln += 1; continue
+
+        instr = None
+        quiet = ignore_warnings
+        ignore_warnings = False
+
+        if istoken(toks[0], TT.KEYWORD):
+            kw = toks[0].value
+            if kw == 'stop': instr = Instr(OP.STOP, [], ln)
+
+            elif kw == 'import':
+                if len(toks) < 2: log_error("malformed import(missing item to import)", ln); return FullReturn()
+                if not istoken(toks[1], (TT.STRING, TT.IDENT)): log_error(f"malformed import(invalid import item '{toks[1].type}')", ln); return FullReturn()
+                if len(toks) > 2: log_error(f"malformed import(unexpected {describe_token(toks[2])} after the item to import)", ln); return FullReturn()
+                instr = Instr(OP.IMPORT, [operand(toks[1], table)], ln)
+                # an import can overwrite any name, even an immutable one, and it can make any name immutable too
+                table.consts.clear()
+                table.immut.clear()
+
+            elif kw == 'log':
+                if len(toks) < 2: log_error("malformed log statement(missing value to log)", ln); return FullReturn()
+                if len(toks) > 2: log_error(f"malformed log statement(unexpected {describe_token(toks[2])} after the value to log)", ln); return FullReturn()
+                instr = Instr(OP.LOG, [operand(toks[1], table)], ln)
+
+            elif kw == 'get':
+                if any([istoken(t, TT.IDENT) and '.' in t.value for t in toks[1:]]): log_error("malformed get statement(can't get into a container's member)", ln); return FullReturn()
+                if len(toks) == 2 and istoken(toks[1], TT.IDENT):
+                    instr = Instr(OP.GET, [table.slot(toks[1].value), 'set'], ln)
+                    table.immut.discard(instr.operands[0].index)
+                    table.consts.pop(instr.operands[0].index, None)
+                elif len(toks) > 2 and istoken(toks[1], TT.KEYWORD) and istoken(toks[2], TT.IDENT):
+                    if toks[1].value not in ('mut', 'immut'): log_error(f"malformed get statement(invalid keyword '{toks[1].value}')", ln); return FullReturn()
+                    instr = Instr(OP.GET, [table.slot(toks[2].value), toks[1].value], ln)
+                    if toks[1].value == 'immut': table.immut.add(instr.operands[0].index)
+                    else: table.immut.discard(instr.operands[0].index)
+                    table.consts.pop(instr.operands[0].index, None)
+                else: log_error(f"malformed get statement(expected 'mut [variable name]', 'immut [variable name]', or '[variable name]')", ln); return FullReturn()
+
+            elif kw in ('mut', 'immut', 'set'):
+                if kw == 'set' and len(toks) < 4: log_error(f"malformed set statement(expected 'set [variable name] as [value]')", ln); return FullReturn()
+                decl = compile_declaration(toks, ln)
+                if isinstance(decl, FullReturn): return FullReturn()
+                name, (kind, payload) = decl
+                if '.' in name:
+                    # only a member that's already there can be changed, containers get their members from their block
+                    if kw != 'set': log_error(f"can't declare '{name}', a container's members can only be changed with 'set'", ln); return FullReturn()
+                    slot = table.member(name)
+                else: slot = table.slot(name)
+                if kind == 'var' or kind == 'expr':
+                    payload = compile_expression([Token(TT.IDENT, payload)] if kind == 'var' else payload, ln, table)
+                    if isinstance(payload, FullReturn): return FullReturn()
+                    if payload.__class__ is Const: kind, payload = 'value', payload.value
+                    elif payload.__class__ is Slot: kind = 'var'
+                # immutability is checked here once, instead of on every assignment
+                index = slot.index if slot.__class__ is Slot else slot.slot.index
+                if kw == 'set' and index in table.immut: log_error(f"can't set immutable variable '{slot.name if slot.__class__ is Slot else slot.slot.name}'", ln); return FullReturn()
+                if kw == 'immut': table.immut.add(index)
+                elif kw == 'mut': table.immut.discard(index)
+                # only a top-level declaration is sure to have run(or stopped everything with an error) before the lines after it
+                if kw == 'immut' and toplevel and kind in ('value', 'list'): table.consts[index] = payload
+                elif slot.__class__ is Slot: table.consts.pop(index, None)
+                instr = Instr({'mut': OP.MUT, 'immut': OP.IMMUT, 'set': OP.SET}[kw], [slot, (kind, payload)], ln)
+                # 'mut x as f()' is a call that runs the declaration with whatever the function returns
+                if kind == 'call': instr = Instr(OP.CALL, [callee(payload[0], table), [operand(a, table) for a in payload[1]], instr], ln)
+
+            elif kw == 'return':
+                if not isfunc: log_error("invalid 'return'", ln); return FullReturn()
+                if len(toks) == 1: instr = Instr(OP.RETURN, [None], ln)
+                elif len(toks) > 2: log_error(f"malformed return(unexpected {describe_token(toks[2])} after the value to return)", ln); return FullReturn()
+                elif istoken(toks[1], TT.IDENT) or istoken(toks[1], VALUE_TYPES): instr = Instr(OP.RETURN, [operand(toks[1], table)], ln)
+                else: log_error(f"invalid type for return '{toks[1].type}'", ln); return FullReturn()
+
+            elif kw in ('repeat', 'if', 'func', 'container'):
+                end = ends.get(ln, stop)
+                if end >= stop: log_error(f"missing 'end' to close '{kw}'", ln); return FullReturn()
+
+                if kw == 'repeat':
+                    if len(toks) < 2: log_error('malformed repeat(amount not given)', ln); return FullReturn()
+                    if not istoken(toks[1], (TT.IDENT, TT.INT)): log_error(f"malformed repeat(invalid repeat amount {toks[1].type})", ln); return FullReturn()
+                    if len(toks) > 2: log_error(f"malformed repeat(unexpected {describe_token(toks[2])} after the amount)", ln); return FullReturn()
+                    before = set(table.immut)
+                    body = compile_lines(token_lines, ln+1, end, isfunc, blocks, table, False)
+                    if isinstance(body, FullReturn): return FullReturn()
+                    instr = Instr(OP.REPEAT, [operand(toks[1], table), declared_slots(body)], ln, body=body)
+                    # the body might not run at all, so only what's immutable either way stays that way
+                    table.immut &= before
+                    table.immut.difference_update(instr.operands[1])
+
+                elif kw == 'if':
+                    cond = compile_condition(toks, ln)
+                    if isinstance(cond, FullReturn): return FullReturn()
+                    cond = compile_expression(cond, ln, table)
+                    if isinstance(cond, FullReturn): return FullReturn()
+                    else_ln = elses.get(ln, -1)
+                    before = set(table.immut)
+                    body = compile_lines(token_lines, ln+1, end if else_ln == -1 else else_ln, isfunc, blocks, table, False)
+                    if isinstance(body, FullReturn): return FullReturn()
+                    # each branch starts from what was immutable before the 'if', after it a name is only immutable if every way through made it so
+                    after, table.immut = table.immut, before
+                    orelse = None
+                    if else_ln != -1:
+                        table.immut = set(before)
+                        orelse = compile_lines(token_lines, else_ln+1, end, isfunc, blocks, table, False)
+                        if isinstance(orelse, FullReturn): return FullReturn()
+                    table.immut = after & table.immut
+                    instr = Instr(OP.IF, [cond], ln, body=body, orelse=orelse)
+
+                elif kw == 'container':
+                    if len(toks) != 2 or not istoken(toks[1], TT.IDENT) or '.' in toks[1].value: log_error("malformed container declaration(expected 'container [name]')", ln); return FullReturn()
+                    # the block runs in a scope of its own, whatever it declares becomes a member
+                    container_table = SlotTable()
+                    body = compile_lines(token_lines, ln+1, end, False, blocks, container_table)
+                    if isinstance(body, FullReturn): return FullReturn()
+                    slot = table.slot(toks[1].value)
+                    table.immut.discard(slot.index)
+                    table.consts.pop(slot.index, None)
+                    instr = Instr(OP.CONTAINER, [slot, container_table, [i.operands[0] for i in body if i.op is OP.FUNC]], ln, body=body)
+
                 else:
-                    log_error(f"unknown value '{toks[0].value}'", ln); return FullReturn()
-            
-            elif istoken(toks[0], TT.STATELABEL):
-                if istoken(toks[0], value='ignorewarning'): ignore_warnings = 2
-                else: log_error(f"unknown statelabel '{toks[0].value}'", ln); return FullReturn()
+                    if len(toks) < 3: log_error("malformed function declaration(missing function name and parentheses)", ln); return FullReturn()
+                    if not istoken(toks[1], TT.IDENT): log_error("malformed function declaration(missing function name)", ln); return FullReturn()
+                    if '.' in toks[1].value: log_error(f"malformed function declaration(function names can't have '.', declare '{toks[1].value.split('.')[-1]}' inside a container instead)", ln); return FullReturn()
+                    labels = []
+                    while len(toks) >= 5 and istoken(toks[-1], TT.STATELABEL):
+                        labels.append(toks[-1].value)
+                        toks = toks[:-1]
+                    for label in labels:
+                        if label not in ('builtin', 'pure'): log_error(f"unknown statelabel '{label}'", ln); return FullReturn()
+                    is_a_builtin_func = 'builtin' in labels
+                    is_a_pure_func = 'pure' in labels
+                    if not (istoken(toks[2], TT.LPAREN) and istoken(toks[-1], TT.RPAREN)): log_error("malformed function declaration(missing parentheses)", ln); return FullReturn()
+                    gotten_args = scrape_funcargs(toks, ln) if len(toks) > 4 else []
+                    if gotten_args is TT.ILLEGAL: return FullReturn()
+                    func_table = SlotTable([a.getname() for a in gotten_args])
+                    body = compile_lines(token_lines, ln+1, end, True, blocks, func_table)
+                    if isinstance(body, FullReturn): return FullReturn()
+                    if is_a_pure_func:
+                        impure = find_impure(body)
+                        if impure != None: log_error(f"pure function '{toks[1].value}' can't {IMPURE_OPS[impure.op]}", impure.line); return FullReturn()
+                    instr = Instr(OP.FUNC, [toks[1].value, gotten_args, is_a_builtin_func, func_table, is_a_pure_func], ln, body=body)
+
+                instr.debug = debug
+                instr.quiet = quiet
+                code.append(instr)
+                ln = end + 1
+                continue
 
+            elif kw in ('end', 'else'): log_error(f"unexpected '{kw}'", ln); return FullReturn()
+
+        elif istoken(toks[0], TT.IDENT):
+            if len(toks) == 1: instr = Instr(OP.NAME, [operand(toks[0], table)], ln)
+            elif len(toks) >= 3 and istoken(toks[1], TT.LPAREN) and istoken(toks[-1], TT.RPAREN):
+                args = scrape_callargs(toks[2:-1], ln)
+                if args is TT.ILLEGAL: return FullReturn()
+                instr = Instr(OP.CALL, [callee(toks[0].value, table), [operand(a, table) for a in args], None], ln)
+            else: log_error("malformed function call", ln); return FullReturn()
+
+        elif istoken(toks[0], TT.STATELABEL):
+            if istoken(toks[0], value='ignorewarning'): ignore_warnings = True
+            else: log_error(f"unknown statelabel '{toks[0].value}'", ln); return FullReturn()
+
+        if instr != None:
+            instr.debug = debug
+            instr.quiet = quiet
+            code.append(instr)
+            # the rest of a file(or function) after a top-level 'stop' can never run, so it isn't compiled
+            if instr.op is OP.STOP and toplevel and optimize_code: break
+        ln += 1
+    return code
+
+
+def compile_code(token_lines: list[list[Token]], isfunc: bool = False, source: str = '<string>') -> MendCode:
+    table = SlotTable()
+    code = compile_lines(token_lines, isfunc=isfunc, table=table)
+    if isinstance(code, FullReturn): return FullReturn()
+    code = MendCode(code, table, source)
+    return optimize(code) if optimize_code else code
+
+
+optimize_code = True
+# writes every program out(as optimized) before it runs, to see what will actually run
+print_optimized = False
+
+def optimize(code: MendCode) -> MendCode:
+    # -> the same program without the lines that can't run or do nothing; the compiled code itself isn't changed, since incremental compiles reuse it
+    warnings = []
+    optimized = MendCode(optimize_block(code.instrs, set(), set(), warnings), code.table, code.source, code.name)
+    optimized.warnings = sorted(warnings, key=lambda w: w[0])
+    return optimized
+
+
+def optimize_block(code: list[Instr], known: set[int], funcs: set[str], warnings: list[tuple[int, str]]) -> list[Instr]:
+    # known are the slots that are sure to be declared by now and funcs the functions, a declaration that fails stops everything so it counts as soon as it's passed
+    out: list[Instr] = []
+    for instr in code:
+        op = instr.op
+        if op is OP.NAME:
+            slot = instr.operands[0]
+            # a bare name only does anything when it's unknown(an error), otherwise it's a warning that can be given up front
+            if slot.name in funcs: continue
+            if slot.__class__ is Slot and slot.index in known:
+                if not instr.quiet: warnings.append((instr.line, f"unused variable '{slot.name}'"))
+                continue
+        elif op is OP.IF:
+            cond = instr.operands[0]
+            if cond.__class__ is Const:
+                # the branch runs in the scope around it either way, so it can take the 'if's place
+                branch = instr.body if cond.value else instr.orelse
+                out.extend(optimize_block(branch if branch != None else [], known, funcs, warnings))
+                if len(out) > 0 and out[-1].op in (OP.STOP, OP.RETURN): break
+                continue
+            body = optimize_block(instr.body, set(known), set(funcs), warnings)
+            orelse = optimize_block(instr.orelse, set(known), set(funcs), warnings) if instr.orelse != None else None
+            instr = Instr(op, instr.operands, instr.line, instr.debug, instr.quiet, body, orelse)
+        elif op is OP.REPEAT:
+            body = optimize_block(instr.body, set(known), set(funcs), warnings)
+            # with nothing left in it, a repeat with a literal amount can't even fail
+            if len(body) == 0 and instr.operands[0].__class__ is not Slot: continue
+            instr = Instr(op, instr.operands, instr.line, instr.debug, instr.quiet, body)
+        elif op is OP.FUNC:
+            name, args = instr.operands[0], instr.operands[1]
+            # only required arguments are sure to be given, and a function can see itself
+            required = set([i for i, a in enumerate(args) if a.isrequired()])
+            instr = Instr(op, instr.operands, instr.line, instr.debug, instr.quiet, optimize_block(instr.body, required, funcs | {name}, warnings))
+            funcs.add(name)
+        elif op is OP.CONTAINER:
+            instr = Instr(op, instr.operands, instr.line, instr.debug, instr.quiet, optimize_block(instr.body, set(), set(), warnings))
+            known.add(instr.operands[0].index)
+        elif op is OP.MUT or op is OP.IMMUT or op is OP.GET:
+            if instr.operands[0].__class__ is Slot: known.add(instr.operands[0].index)
+        elif op is OP.CALL and instr.operands[2] != None and instr.operands[2].op is not OP.SET: known.add(instr.operands[2].operands[0].index)
+        out.append(instr)
+        # nothing after a 'stop' or 'return' in the same block can run
+        if op is OP.STOP or op is OP.RETURN: break
+    return out
 
-        #print('vars', vars)
-        #print('consts', consts)
-        
-        if ignore_warnings > 0: ignore_warnings -= 1
+
+def format_code(code: list[Instr], depth: int = 0) -> list[str]:
+    out = []
+    for instr in code:
+        operands = instr.operands[:2] if instr.op is OP.FUNC else instr.operands
+        out.append(f"{instr.line+1:>5} {'    ' * depth}{instr.op.value}{operands}")
+        if instr.body != None: out.extend(format_code(instr.body, depth+1))
+        if instr.orelse != None: out.append(f"{'':>5} {'    ' * depth}ELSE"); out.extend(format_code(instr.orelse, depth+1))
+    return out
+
+
+
+def shift_lines(code: list[Instr], delta: int):
+    for instr in code:
+        instr.line += delta
+        if instr.body != None: shift_lines(instr.body, delta)
+        if instr.orelse != None: shift_lines(instr.orelse, delta)
+        if instr.op == OP.CALL and instr.operands[2] != None: instr.operands[2].line += delta
+
+
+def split_units(token_lines: list[list[Token]], ends: dict[int, int]) -> list[tuple[int, int]]:
+    # top-level statements and blocks, each of which compiles on its own; a statelabel line stays with whatever follows it(blank lines don't count)
+    units = []
+    start = ln = 0
+    labelled = False
+    while ln < len(token_lines):
+        toks = token_lines[ln]
+        first = toks[0].type if len(toks) > 0 else None
+        if first == TT.STATELABEL: labelled = True; ln += 1; continue
+        if labelled and (first == None or (len(toks) == 1 and first == TT.DEBUG)): ln += 1; continue
+        labelled = False
+        if first == TT.KEYWORD and toks[0].value in BLOCK_OPENERS: ln = ends.get(ln, len(token_lines) - 1)
         ln += 1
-    if isimported: return vars, consts, funcs
+        units.append((start, ln))
+        start = ln
+    if start < len(token_lines): units.append((start, len(token_lines)))
+    return units
+
+
+class IncrementalFile:
+    # remembers the last version of a file, so an edit only re-lexes the lines that changed and recompiles the top-level blocks they're in
+    def __init__(self, source: str = '<string>'):
+        self.source = source
+        self.lines: list[str] = []
+        self.token_lines: list[list[Token]] = []
+        # names keep their slot across versions, which is what lets compiled blocks be reused
+        self.table = SlotTable()
+        # the compiled blocks of the last version by their text, a list since the same text can show up more than once
+        self.units: dict[tuple[str], list[list]] = {}
+        self.stats: dict[str, int] = {}
+
+    def relex(self, lines: list[str]) -> list[list[Token]]:
+        old = self.lines
+        limit = min(len(old), len(lines))
+        prefix = 0
+        while prefix < limit and old[prefix] == lines[prefix]: prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old[-1-suffix] == lines[-1-suffix]: suffix += 1
+        middle = lex_file('\n'.join(lines[prefix:len(lines)-suffix])) if prefix + suffix < len(lines) else []
+        self.stats['relexed_lines'] = len(middle)
+        return self.token_lines[:prefix] + middle + self.token_lines[len(old)-suffix:]
+
+    def slots_in(self, token_lines: list[list[Token]]) -> list[int]:
+        names = self.table.names
+        return [names[t.value] for toks in token_lines for t in toks if t.type == TT.IDENT and t.value in names]
+
+    def update(self, text: str) -> MendCode:
+        lines = text.split('\n')
+        token_lines = self.relex(lines)
+        self.lines, self.token_lines = lines, token_lines
+
+        blocks = match_blocks(token_lines)
+        table = self.table
+        table.immut = set()
+        table.consts = {}
+        code: list[Instr] = []
+        units: dict[tuple[str], list[list]] = {}
+        reused = compiled = 0
+        for start, stop in split_units(token_lines, blocks[0]):
+            key = tuple(lines[start:stop])
+            previous = self.units.get(key)
+            entry = previous.pop() if previous else None
+            # a block compiles the same as long as its text and whether the names it uses were immutable(and constant) going in are the same
+            if entry != None and all([table.state(i) == was for i, was in entry[2].items()]):
+                if entry[0] != start: shift_lines(entry[1], start - entry[0]); entry[0] = start
+                if entry[4]: table.consts.clear()
+                for i, now in entry[3].items(): table.restore(i, now)
+                reused += 1
+            else:
+                used = self.slots_in(token_lines[start:stop])
+                before = {i: table.state(i) for i in used}
+                instrs = compile_lines(token_lines, start, stop, False, blocks, table)
+                if isinstance(instrs, FullReturn): return FullReturn()
+                used = self.slots_in(token_lines[start:stop])
+                imports = any([len(toks) > 0 and istoken(toks[0], TT.KEYWORD, 'import') for toks in token_lines[start:stop]])
+                entry = [start, instrs, before, {i: table.state(i) for i in used}, imports]
+                compiled += 1
+            if key in units: units[key].append(entry)
+            else: units[key] = [entry]
+            code.extend(entry[1])
+            if optimize_code and len(entry[1]) > 0 and entry[1][-1].op is OP.STOP: break
+        self.units = units
+        self.stats['reused_blocks'] = reused
+        self.stats['compiled_blocks'] = compiled
+        code = MendCode(code, table, self.source)
+        return optimize(code) if optimize_code else code
+
+
+
+class Scope:
+    def __init__(self, table: SlotTable = None, root_folder: str = '', source: str = '<string>', funcs: dict[str, MendFunction] = None):
+        self.table = table if table != None else SlotTable()
+        self.source = source
+        self.slots: list[Any] = [UNSET] * len(self.table.names)
+        self.immut: set[int] = set()
+        self.funcs: dict[str, MendFunction] = funcs if funcs != None else {}
+        self.root_folder = root_folder
+        # the name of the '@pure' function running in this scope, which can only call builtins and other pure functions
+        self.pure: str = None
+        self.__owns_table = table == None
+        self.__owns_funcs = funcs == None
+
+    def bind(self, name: str, value: Any, immutable: bool = False, overwrite: bool = True):
+        # for names only known at runtime(imports, arguments), the shared table is copied before it's extended
+        index = self.table.names.get(name)
+        if index == None:
+            if not self.__owns_table: self.table = self.table.copy(); self.__owns_table = True
+            index = self.table.slot(name).index
+            self.slots.append(UNSET)
+        if not overwrite and self.slots[index] is not UNSET: return
+        self.slots[index] = value
+        if immutable: self.immut.add(index)
+        else: self.immut.discard(index)
+
+    def adopt(self, table: SlotTable):
+        # for a longer lived scope, the table of the next code run in it(compiled from a copy of this one's, so every old name keeps its slot)
+        self.table = table
+        self.__owns_table = True
+        self.slots.extend([UNSET] * (len(table.names) - len(self.slots)))
+
+    def own_funcs(self) -> dict[str, MendFunction]:
+        # a function call shares the functions of the scope it was declared in until it declares its own
+        if not self.__owns_funcs: self.funcs = dict(self.funcs); self.__owns_funcs = True
+        return self.funcs
+
+    def lookup(self, name: str, default: Any = None):
+        index = self.table.names.get(name)
+        if index == None or self.slots[index] is UNSET: return default
+        return self.slots[index]
+
+    def merge(self, vars: dict[str, Any], consts: ImmutDict, funcs: dict[str, MendFunction]):
+        # the same exports can be merged into many scopes, each gets its own containers
+        for k in vars: self.bind(k, vars[k].copy() if vars[k].__class__ is MendContainer else vars[k])
+        for k in consts.keys(): self.bind(k, consts.get(k), True, False)
+        extend_dict(self.own_funcs(), funcs, True)
+
+    def export(self) -> tuple[dict[str, Any], ImmutDict, dict[str, MendFunction]]:
+        vars, consts = {}, ImmutDict()
+        for name, index in self.table.names.items():
+            value = self.slots[index]
+            if value is UNSET: continue
+            if index in self.immut: consts.add(name, value)
+            else: vars[name] = value
+        return vars, consts, self.funcs
+
+
+def resolve_value(value: Token | Slot | Member, scope: Scope):
+    if value.__class__ is Slot:
+        value = scope.slots[value.index]
+        return TT.ILLEGAL if value is UNSET else value
+    if value.__class__ is Member: return resolve_member(value, scope)
+    return value.value
+
+
+def resolve_member(member: Member, scope: Scope):
+    root = scope.slots[member.slot.index]
+    if root.__class__ is not MendContainer: return TT.ILLEGAL
+    layout = root.layout
+    # the index found last time holds for as long as the container keeps the same layout
+    cached, index = member.cache
+    if cached is layout: return root.values[index]
+    index = layout.paths.get(member.names)
+    if index == None:
+        value = root.get(member.names)
+        return TT.ILLEGAL if value is UNSET else value
+    member.cache = (layout, index)
+    return root.values[index]
+
+
+def assign_member(member: Member, value: Any, scope: Scope, ln: int):
+    root = scope.slots[member.slot.index]
+    cached, index = member.cache
+    if cached is root.layout and index not in cached.immut and value.__class__ is not MendContainer: root.put(index, value); return
+    problem = root.set(member.names, value)
+    if problem != None: log_error(f"can't set {problem} '{member.name}'", ln); return FullReturn()
+
+
+def build_container(scope: Scope, funcs: list[str]) -> MendContainer:
+    # -> everything a container's block declared, in the order it's declared in
+    container = MendContainer()
+    for name, index in scope.table.names.items():
+        value = scope.slots[index]
+        if value is not UNSET: container.add((name,), value, index in scope.immut)
+    for name in funcs:
+        if name in scope.funcs: container.add((name,), scope.funcs[name])
+    return container
+
+
+def operand_name(value: Token | Slot | Member) -> str: return value.name if isinstance(value, (Slot, Member)) else value.value
+
+
+def run_import(instr: Instr, scope: Scope):
+    ln = instr.line
+    tok = instr.operands[0]
+    if isinstance(tok, (Slot, Member)):
+        var_result = resolve_value(tok, scope)
+        if var_result is TT.ILLEGAL: log_error(f"unknown variable '{tok.name}'", ln); return FullReturn()
+        if not isinstance(var_result, str): log_error(f"expected 'string', but got '{var_result}' of type {type(var_result).__name__} instead", ln); return FullReturn()
+        import_path = var_result
+    else: import_path = tok.value
+    if context.bundle != None:
+        imported = import_bundled(import_path, scope, instr.debug)
+        if imported is TT.ILLEGAL: log_error(f"malformed import('{import_path}' isn't in the bundle)", ln); return FullReturn()
+        return imported
+    if not Path(scope.root_folder, import_path).exists():
+        import_path += '.mend'
+        if not Path(scope.root_folder, import_path).exists():
+            log_error(f"malformed import(path '{import_path}' doesn't exist)", ln)
+            return FullReturn()
+    try:
+        folder = Path(scope.root_folder, import_path)
+        if folder.is_dir():
+            snapshot = load_snapshot(folder)
+            if snapshot != None:
+                context.output.write(snapshot[2])
+                scope.merge(*snapshot[1])
+                if instr.debug: context.output.write(f"imported '{str(folder)}' from its snapshot\n")
+            elif isinstance(import_folder(folder, scope, instr.debug), FullReturn): return FullReturn()
+        else:
+            imported = import_mend_file(scope.root_folder, import_path, scope)
+            if isinstance(imported, FullReturn): return FullReturn()
+            if instr.debug: context.output.write(f"imported '{str(Path(scope.root_folder, import_path))}'\n")
+    except Exception as e: log_error(f"malformed import({e})", ln); return FullReturn()
+
+
+def import_folder(folder: Path, scope: Scope, debug: bool = False):
+    # every file is compiled up front(in parallel when there are enough of them), then run and merged in filename order
+    files = sorted([f for f in folder.iterdir() if str(f).endswith('.mend')], key=lambda f: f.name)
+    for f, (code, errors) in zip(files, load_compiled_many(files)):
+        if isinstance(code, FullReturn): context.diagnostics.write(errors); return FullReturn()
+        if debug: context.output.write(f"imported '{str(f)}'\n")
+        imported = import_mend_file(str(f.parent), f.name, scope, code)
+        if isinstance(imported, FullReturn): return FullReturn()
 
 
+def check_declaration(instr: Instr, scope: Scope):
+    ln = instr.line
+    slot = instr.operands[0]
+    if slot.__class__ is Member:
+        root = slot.slot
+        if scope.slots[root.index] is UNSET: log_error(f"can't set unknown variable '{root.name}'", ln); return FullReturn()
+        if scope.slots[root.index].__class__ is not MendContainer: log_error(f"can't set '{slot.name}', '{root.name}' isn't a container", ln); return FullReturn()
+        if root.index in scope.immut: log_error(f"can't set immutable variable '{root.name}'", ln); return FullReturn()
+        return
+    index = slot.index
+    if instr.op == OP.SET:
+        if scope.slots[index] is UNSET: log_error(f"can't set unknown variable '{slot.name}'", ln); return FullReturn()
+        if index in scope.immut: log_error(f"can't set immutable variable '{slot.name}'", ln); return FullReturn()
+    elif scope.slots[index] is not UNSET: log_error(f"can't declare variable '{slot.name}', already exists", ln); return FullReturn()
+
+
+def run_declaration(instr: Instr, scope: Scope, value: Any = UNSET):
+    if isinstance(check_declaration(instr, scope), FullReturn): return FullReturn()
+    slot, (kind, payload) = instr.operands
+    if value is not UNSET: pass
+    elif kind == 'null': value = Null()
+    elif kind == 'var':
+        value = scope.slots[payload.index]
+        if value is UNSET: log_error(f"malformed variable declaration(unknown variable '{payload.name}')", instr.line); return FullReturn()
+    elif kind == 'expr':
+        value = evaluate(payload, scope, instr.line)
+        if isinstance(value, FullReturn): return FullReturn()
+    else: value = payload
+    # containers are values, each name gets its own(the copy is only made for real when one of them changes)
+    if value.__class__ is MendContainer: value = value.copy()
+    limits = context.limits
+    if limits != None and limits.max_memory_items != None and not limits.charge(value, instr.line): return FullReturn()
+    if slot.__class__ is Member: return assign_member(slot, value, scope, instr.line)
+    scope.slots[slot.index] = value
+    if instr.op == OP.IMMUT: scope.immut.add(slot.index)
+
+
+def check_condition(instr: Instr, scope: Scope):
+    passed = evaluate(instr.operands[0], scope, instr.line)
+    return passed if passed.__class__ is FullReturn else bool(passed)
+
+
+
+class Frame:
+    # one block being run; ifs, repeats and function calls push a frame instead of recursing, so how deep Mend code can go isn't tied to Python's stack
+    __slots__ = ('code', 'pc', 'scope', 'kind', 'instr', 'remaining', 'funcs', 'func', 'key', 'label', 'opened')
+
+    def __init__(self, code: list[Instr], scope: Scope, kind: str, instr: Instr = None):
+        self.code = code
+        self.pc = 0
+        self.scope = scope
+        self.kind = kind # 'root', 'block', 'repeat', 'call' or 'container'
+        self.instr = instr
+        self.remaining = 0
+        self.funcs = 0
+        self.func: MendFunction = None
+        self.key: tuple = None
+        self.label: str = None
+        self.opened: tuple = None
+
+    def __repr__(self): return f'Frame({self.kind}, {self.pc}/{len(self.code)})'
+
+
+# how many Mend function calls can be nested, separate from Python's own recursion limit
+recursion_limit = 1000
+
+
+class Suspended:
+    # what a resumable run_frames returns instead of finishing, running the same stack again carries on from where it stopped
+    def __init__(self, reason: str): self.reason = reason # 'input'(a 'get' is waiting) or 'budget'(it ran for as long as it was allowed to)
+
+    def __repr__(self): return f'Suspended({self.reason})'
+
+WAITING_FOR_INPUT = Suspended('input')
+OUT_OF_BUDGET = Suspended('budget')
+
+
+# instructions are handed out to the executor this many at a time, the limits are only checked in between
+CHECK_INTERVAL = 1024
+# what the executor counts down from without limits, kept small enough for Python's fast int math
+UNCHECKED = (1 << 30) - 1
+
+class RunLimits:
+    # what a single run is allowed to use, None for no limit; a run over any of them stops with an error and a report of how far it got
+    def __init__(self, max_steps: int = None, max_call_depth: int = None, max_memory_items: int = None, timeout: float = None):
+        # steps are the instructions that ran, counted a block at a time as it's left(a function call, an 'if' branch, a repeat iteration), so a run can go a block past the limit before it's stopped
+        self.max_steps = max_steps
+        self.max_call_depth = max_call_depth
+        # every variable counts as an item, and so does every item of a list or container and every character of a string
+        self.max_memory_items = max_memory_items
+        self.timeout = timeout
+        # instructions handed out so far, whatever a run gives back unused is taken off again when it finishes
+        self.steps = 0
+        self.peak_depth = 0
+        self.items = 0
+        self.peak_items = 0
+        self.started = perf_counter()
+        # the stacks running right now(an import runs on a stack of its own), for counting items
+        self.stacks: list[list[Frame]] = []
+        self.exceeded: str = None
+
+    def start(self, stack: list[Frame]) -> int:
+        # -> how many instructions the stack can run before the next check, or -1 if it can't run at all
+        self.stacks.append(stack)
+        frame = stack[-1]
+        granted = self.check(0, frame.instr.line if frame.instr != None else 0)
+        if granted < 0: self.finish(0)
+        return granted
+
+    def finish(self, unused: int):
+        self.steps -= unused
+        self.stacks.pop()
+        # the report waits for the outermost run to stop, by then every unused instruction has been given back
+        if len(self.stacks) == 0 and self.exceeded != None:
+            report = self.report()
+            context.diagnostics.write(f"stopped after {report['steps']} steps in {report['seconds']:.3f}s, with a call depth of {report['peak_call_depth']} and {report['peak_memory_items']} memory items at most\n")
+
+    def check(self, depth: int, ln: int, owed: int = 0) -> int:
+        # -> how many more instructions can be paid for before the next check, or -1 once a limit is exceeded(after reporting it)
+        # owed is what ran past the last grant, a block can be longer than what was left of it
+        self.steps += owed
+        if depth > self.peak_depth: self.peak_depth = depth
+        if self.max_steps != None and self.steps > self.max_steps: return self.exceed(f"step limit exceeded(more than {self.max_steps} instructions)", ln)
+        if self.timeout != None and perf_counter() - self.started > self.timeout: return self.exceed(f"time limit exceeded(ran for more than {self.timeout}s)", ln)
+        if self.max_memory_items != None and self.count() > self.max_memory_items: return self.exceed(f"memory limit exceeded(more than {self.max_memory_items} items)", ln)
+        # granted instructions count as run straight away, whatever isn't used is given back by finish()
+        granted = CHECK_INTERVAL if self.max_steps == None else min(CHECK_INTERVAL, self.max_steps - self.steps)
+        self.steps += granted
+        return granted
+
+    def charge(self, value: Any, ln: int) -> bool:
+        # a declaration big enough to go over the limit on its own has everything counted again right away, instead of at the next check
+        size = len(value) if value.__class__ in SIZED_VALUES else len(value.values) if value.__class__ is MendContainer else 0
+        if not self.room(size, ln): return False
+        self.items += size
+        if self.items > self.peak_items: self.peak_items = self.items
+        return True
+
+    def room(self, size: int, ln: int) -> bool:
+        # -> whether size more items still fit, checked before a big string or list is built rather than after
+        if self.items + size > self.max_memory_items and self.count() + size > self.max_memory_items:
+            self.exceed(f"memory limit exceeded(more than {self.max_memory_items} items)", ln)
+            return False
+        return True
+
+    def count(self) -> int:
+        seen = set()
+        items = 0
+        for stack in self.stacks:
+            for frame in stack:
+                scope = frame.scope
+                if id(scope) in seen: continue
+                seen.add(id(scope))
+                for value in scope.slots:
+                    if value is UNSET: continue
+                    cls = value.__class__
+                    items += 1 + (len(value) if cls in SIZED_VALUES else len(value.values) if cls is MendContainer else 0)
+        self.items = items
+        if items > self.peak_items: self.peak_items = items
+        return items
+
+    def exceed(self, details: str, ln: int) -> int:
+        self.exceeded = details
+        log_error(details, ln)
+        return -1
+
+    def report(self) -> dict[str, Any]:
+        # steps handed out but not run yet are counted too, so while running this is at most CHECK_INTERVAL instructions ahead
+        return {'steps': self.steps, 'seconds': perf_counter() - self.started, 'peak_call_depth': self.peak_depth, 'peak_memory_items': self.peak_items, 'exceeded': self.exceeded}
+
+
+SIZED_VALUES = (str, list, NumList)
+
+
+def out_of_memory(ln: int):
+    # Python running out of memory ends the run like going over the memory limit does
+    limits = context.limits
+    if limits != None: limits.exceed("memory limit exceeded(out of memory)", ln)
+    else: log_error("out of memory", ln)
+    return FullReturn()
+
+def recharge(limits: RunLimits, tick: int, depth: int, ln: int) -> int:
+    # -> what the executor counts down from next, or -1 if a limit was exceeded
+    if limits == None: return UNCHECKED
+    return limits.check(depth, ln, -tick)
+
+
+def make_limits(max_steps: int = None, max_call_depth: int = None, max_memory_items: int = None, timeout: float = None) -> RunLimits:
+    # -> None when nothing is limited, so a run without limits doesn't pay for checking them
+    if max_steps == None and max_call_depth == None and max_memory_items == None and timeout == None: return None
+    return RunLimits(max_steps, max_call_depth, max_memory_items, timeout)
+
+def use_limits(limits: RunLimits) -> RunLimits:
+    # the limits of the run going on right now, set by run(), run_file() and run_captured()
+    previous = context.limits
+    context.limits = limits
+    return previous
+
+
+def start_call(instr: Instr, scope: Scope):
+    # -> the frame to run the function in, None if a '@pure' function's cache already had the result, or FullReturn
+    ln = instr.line
+    name, args, target = instr.operands
+    if name.__class__ is Member:
+        func = resolve_member(name, scope)
+        if not isinstance(func, MendFunction): log_error(f"unknown value '{name.name}'" if func is TT.ILLEGAL else f"'{name.name}' isn't a function", ln); return FullReturn()
+    else:
+        func = scope.funcs.get(name)
+        if func == None: func = BUILTIN_FUNCTIONS.get(name)
+        if func == None: log_error(f"unknown value '{name}'", ln); return FullReturn()
+    # which function gets called is only known now, so this is where a pure function calling an impure one is caught
+    if scope.pure != None and not func.ispure() and not func.isnative(): log_error(f"pure function '{scope.pure}' can't call '{func.get_name()}', it isn't pure", ln); return FullReturn()
+    inputs = scrape_funcinputs(args, scope, func.get_args(), ln)
+    if inputs is TT.ILLEGAL: return FullReturn()
+    if target != None and isinstance(check_declaration(target, scope), FullReturn): return FullReturn()
+    if instr.debug: context.output.write(f'running function:\n{func}\nwith inputs:\n{inputs}\n')
+    key, cached = func.cached(inputs)
+    if cached is not UNSET: return finish_call(instr, func, None, cached, scope)
+    if func.isnative():
+        returned = func.call(inputs, ln)
+        if isinstance(returned, FullReturn): return FullReturn()
+        return finish_call(instr, func, None, returned, scope)
+    code = func.get_content()
+    callee = Scope(code.table, scope.root_folder, code.source, func.get_closure())
+    if func.ispure(): callee.pure = func.get_name()
+    # a function's table starts with its arguments, so the n-th input goes in the n-th slot
+    slots = callee.slots
+    for i, (value, farg) in enumerate(inputs):
+        slots[i] = value
+        if value.__class__ is MendFunction: callee.own_funcs()[farg.getname()] = value
+    frame = Frame(code.instrs, callee, 'call', instr)
+    frame.func = func
+    frame.key = key
+    frame.label = code.name
+    return frame
+
+
+def finish_call(instr: Instr, func: MendFunction, key: tuple, returned: Any, scope: Scope):
+    func.remember(key, returned)
+    if instr.debug and func.ispure(): context.output.write(f'cache: {func.cache_info()}\n')
+    target = instr.operands[2]
+    if target != None: return run_declaration(target, scope, Null() if returned is None else returned)
+
+
+def end_iteration(frame: Frame):
+    # anything a repeat body declares only lives until the end of its iteration
+    scope = frame.scope
+    for index in frame.instr.operands[1]: scope.slots[index] = UNSET; scope.immut.discard(index)
+    if len(scope.funcs) != frame.funcs:
+        for k in list(scope.funcs)[frame.funcs:]: scope.funcs.pop(k)
+
+
+def run_frames(stack: list[Frame], budget: int = None):
+    # runs until the bottom frame finishes, returning TT.STOP, a MendReturn, None, or FullReturn on an error
+    # with a budget(how many frames and repeat iterations it can go through) the run is resumable, and returns a Suspended when it runs out or a 'get' has no input yet
+    prof = context.profiler
+    if prof != None: prof.enter(stack[0])
+    depth = len([f for f in stack if f.kind == 'call'])
+    # counts down the instructions left until the limits are checked again, without limits it's just topped back up
+    limits = context.limits
+    max_depth = recursion_limit
+    tick = UNCHECKED
+    if limits != None:
+        if limits.max_call_depth != None: max_depth = min(recursion_limit, limits.max_call_depth)
+        tick = limits.start(stack)
+        if tick < 0: return FullReturn()
+    ln = 0
+    try:
+        while len(stack) > 0:
+            if budget != None:
+                budget -= 1
+                if budget < 0: return OUT_OF_BUDGET
+            frame = stack[-1]
+            code, scope, pc = frame.code, frame.scope, frame.pc
+            end = len(code)
+            pushed = None
+            signal = None
+            while True:
+                if pc == end:
+                    # a repeat body starts its next iteration here, its last one ends below with the frame being popped
+                    if frame.kind != 'repeat' or frame.remaining == 1: break
+                    if len(scope.funcs) != frame.funcs or len(frame.instr.operands[1]) > 0: end_iteration(frame)
+                    frame.remaining -= 1
+                    pc = 0
+                    tick -= end
+                    if tick < 0:
+                        tick = recharge(limits, tick, depth, frame.instr.line)
+                        if tick < 0: return FullReturn()
+                    if budget != None:
+                        budget -= 1
+                        if budget < 0:
+                            frame.pc = pc
+                            return OUT_OF_BUDGET
+                instr = code[pc]
+                pc += 1
+                if prof != None: prof.line(frame, instr)
+                op = instr.op
+                ln = instr.line
+
+                if op is OP.CALL:
+                    if depth >= max_depth:
+                        if limits == None or limits.max_call_depth == None: log_error(f"recursion limit exceeded(more than {recursion_limit} nested function calls)", ln); return FullReturn()
+                        # a call depth limit above the recursion limit is held to it, and still counts as going over the limit
+                        limits.peak_depth = depth
+                        limits.exceed(f"call depth limit exceeded(more than {max_depth} nested function calls)", ln); return FullReturn()
+                    pushed = start_call(instr, scope)
+                    if pushed.__class__ is not Frame:
+                        if pushed == None: continue
+                        return FullReturn()
+                    depth += 1
+                    break
+
+                elif op is OP.LOG:
+                    var_result = resolve_value(instr.operands[0], scope)
+                    if var_result is TT.ILLEGAL: log_error(f"could not log unknown variable '{operand_name(instr.operands[0])}'", ln); return FullReturn()
+                    context.output.write(f'{var_result}\n')
+
+                elif op is OP.MUT or op is OP.IMMUT or op is OP.SET:
+                    if isinstance(run_declaration(instr, scope), FullReturn): return FullReturn()
+
+                elif op is OP.IF:
+                    passed = check_condition(instr, scope)
+                    if isinstance(passed, FullReturn): return FullReturn()
+                    branch = instr.body if passed else instr.orelse
+                    if branch: pushed = Frame(branch, scope, 'block'); break
+
+                elif op is OP.REPEAT:
+                    amount_operand = instr.operands[0]
+                    amount = resolve_value(amount_operand, scope)
+                    if amount is TT.ILLEGAL: log_error(f"unknown variable '{operand_name(amount_operand)}'", ln); return FullReturn()
+                    if not isinstance(amount, int): log_error(f"malformed repeat(invalid repeat amount '{amount}')", ln); return FullReturn()
+                    if amount > 0 and len(instr.body) > 0:
+                        pushed = Frame(instr.body, scope, 'repeat', instr)
+                        pushed.remaining = amount
+                        pushed.funcs = len(scope.funcs)
+                        break
+
+                elif op is OP.RETURN:
+                    if instr.operands[0] == None: signal = MendReturn(); break
+                    about_to_return = resolve_value(instr.operands[0], scope)
+                    if about_to_return is TT.ILLEGAL: log_error(f"unknown variable '{operand_name(instr.operands[0])}'", ln); return FullReturn()
+                    signal = MendReturn(about_to_return)
+                    break
+
+                elif op is OP.NAME:
+                    slot = instr.operands[0]
+                    if slot.name in scope.funcs: pass
+                    elif resolve_value(slot, scope) is not TT.ILLEGAL:
+                        if not instr.quiet: log_warning(f"unused variable '{slot.name}'", ln)
+                    else: log_error(f"unknown value '{slot.name}'", ln); return FullReturn()
+
+                elif op is OP.FUNC:
+                    funcname, gotten_args, is_a_builtin_func, func_table, is_a_pure_func = instr.operands
+                    if funcname in scope.funcs and not instr.quiet:
+                        if scope.funcs[funcname].isbuiltin(): log_warning(f"declaration of function '{funcname}' is overriding a builtin function, did you mean to do this?(to stop this warning, add '@ignorewarning' on the line before)", ln)
+                        else: log_warning(f"declaration of function '{funcname}' is overriding a previous function, did you mean to do this?(to stop this warning, add '@ignorewarning' on the line before)", ln)
+                    funcs = scope.own_funcs()
+                    funcs[funcname] = MendFunction(funcname, gotten_args, MendCode(instr.body, func_table, scope.source, funcname), is_a_builtin_func, is_a_pure_func, closure=funcs)
+
+                elif op is OP.GET:
+                    slot, mode = instr.operands
+                    context.output.flush()
+                    if context.diagnostics is not context.output: context.diagnostics.flush()
+                    uinp = input('give input\n') if context.input_source == None else context.input_source('give input\n')
+                    if uinp == None:
+                        if budget == None: log_error("'get' has no input to read", ln); return FullReturn()
+                        # the 'get' runs again when the stack is resumed
+                        frame.pc = pc - 1
+                        return WAITING_FOR_INPUT
+                    scope.slots[slot.index] = uinp
+                    if mode == 'immut': scope.immut.add(slot.index)
+                    else: scope.immut.discard(slot.index)
+
+                elif op is OP.IMPORT:
+                    # the imported file runs on a stack of its own, which can have the instructions this one was handed but hasn't used
+                    if limits != None: limits.steps -= tick; tick = 0
+                    if isinstance(run_import(instr, scope), FullReturn): return FullReturn()
+
+                elif op is OP.CONTAINER:
+                    slot, table, funcs = instr.operands
+                    if scope.slots[slot.index] is not UNSET: log_error(f"can't declare variable '{slot.name}', already exists", ln); return FullReturn()
+                    pushed = Frame(instr.body, Scope(table, scope.root_folder, scope.source, scope.funcs), 'container', instr)
+                    pushed.scope.pure = scope.pure
+                    break
+
+                elif op is OP.STOP: signal = TT.STOP; break
+
+            frame.pc = pc
+            if pushed != None:
+                stack.append(pushed)
+                if prof != None: prof.enter(pushed)
+                continue
 
-def run(code: str | list[str] | tuple[str], root_folder: str = ''):
-    lines = code.split('\n') if isinstance(code, str) else list(code)
+            # the frame ran off its end(signal is None) or hit 'stop' or 'return', pop frames until something handles it
+            while True:
+                frame = stack[-1]
+                kind = frame.kind
+                if kind == 'repeat':
+                    end_iteration(frame)
+                    if signal is TT.STOP: signal = None
+                stack.pop()
+                if prof != None: prof.leave(frame)
+                # only the instructions that ran are counted, a 'return' or 'stop' leaves the rest of the block unpaid for
+                tick -= frame.pc
+                if tick < 0:
+                    tick = recharge(limits, tick, depth, ln)
+                    if tick < 0: return FullReturn()
+                if kind == 'call':
+                    depth -= 1
+                    returned = signal.value if isinstance(signal, MendReturn) else None
+                    if isinstance(finish_call(frame.instr, frame.func, frame.key, returned, stack[-1].scope), FullReturn): return FullReturn()
+                    break
+                if kind == 'root': return signal
+                if kind == 'container':
+                    # a 'stop' in the block only ends the block
+                    instr = frame.instr
+                    stack[-1].scope.slots[instr.operands[0].index] = build_container(frame.scope, instr.operands[2])
+                    stack[-1].scope.immut.discard(instr.operands[0].index)
+                    break
+                if signal == None: break
+    except MemoryError: return out_of_memory(ln)
+    finally:
+        # however the run ends, the instructions it was handed but never ran are given back
+        if limits != None: limits.finish(tick if tick > 0 else 0)
+
+
+def execute(code: MendCode, isfunc: bool = False, funcargs: list[list[Any, MendFuncArg]] = [], isimported: bool = False, root_folder: str = '', funcs: dict[str, MendFunction] = None, scope: Scope = None):
+    if scope == None: scope = Scope(code.table, root_folder, code.source, funcs)
+    if len(funcargs) > 0: inject_args(scope, funcargs)
+    if not isfunc:
+        # printed here rather than when compiling, so code from the compile cache shows up too
+        if print_optimized: context.output.write(f"optimized '{code.source}':\n" + ''.join([l + '\n' for l in format_code(code.instrs)]))
+        for line, details in code.warnings: log_warning(details, line)
+
+    frame = Frame(code.instrs, scope, 'root')
+    # imported files get their profiler frame from import_mend_file
+    if not isimported: frame.label = code.name if isfunc else '<main>'
+    result = run_frames([frame])
+    if isinstance(result, FullReturn): return FullReturn()
+    if isfunc and isinstance(result, MendReturn): return result.value
+    if isimported: return scope.export()
+    return result
+
+
+def interpret(token_lines: list[list[Token]], isfunc: bool = False, funcargs: list[list[Any, MendFuncArg]] = [], isimported: bool = False, root_folder: str = '', output: MendOutput = None, diagnostics: MendOutput = None):
+    previous = use_output(output, diagnostics)
+    # every run imports its modules afresh, so their side effects happen every time it's run
+    registry = use_registry(ModuleRegistry())
+    try:
+        code = compile_code(token_lines, isfunc)
+        if isinstance(code, FullReturn): return FullReturn()
+        return execute(code, isfunc, funcargs, isimported, root_folder)
+    finally:
+        use_registry(registry)
+        restore_output(previous)
+
+
+
+CACHE_FOLDER = '__mendcache__'
+use_compile_cache = True
+compiled_files: dict[str, tuple[tuple, MendCode]] = {}
+
+def cache_path(source: Path) -> Path: return Path(source.parent, CACHE_FOLDER, source.name + 'c')
+
+
+def compile_key(source: Path) -> tuple:
+    # compiled code is reused while the source's path, mtime and size and the interpreter version all still match
+    stat = source.stat()
+    return (INTERPRETER_VERSION, str(source), stat.st_mtime_ns, stat.st_size)
+
+
+def find_compiled(source: Path, key: tuple) -> MendCode:
+    cached = compiled_files.get(str(source))
+    if cached != None and cached[0] == key: return cached[1]
+
+    mendc = cache_path(source)
+    if use_compile_cache and mendc.exists():
+        try:
+            with open(mendc, 'rb') as f: cached = pickle.load(f)
+            if cached[0] == key: compiled_files[str(source)] = cached; return cached[1]
+        except Exception: pass
+    return None
+
+
+def store_compiled(source: Path, key: tuple, code: MendCode):
+    compiled_files[str(source)] = (key, code)
+    if use_compile_cache:
+        try:
+            mendc = cache_path(source)
+            mendc.parent.mkdir(exist_ok=True)
+            with open(mendc, 'wb') as f: pickle.dump((key, code), f, pickle.HIGHEST_PROTOCOL)
+        except OSError: pass
+        # code too deeply nested to pickle just isn't cached, a half written .mendc would only be read back as garbage
+        except RecursionError: mendc.unlink(missing_ok=True)
+
+
+# while watching, files are recompiled through an IncrementalFile that remembers their last version
+use_incremental = False
+incremental_files: dict[str, IncrementalFile] = {}
+
+def compile_source(source: str) -> MendCode:
+    with open(source, 'rt') as f: text = f.read()
+    if not use_incremental: return compile_code(lex_file(text), source=source)
+    if source not in incremental_files: incremental_files[source] = IncrementalFile(source)
+    return incremental_files[source].update(text)
+
+
+def load_compiled(path: str | Path) -> MendCode:
+    source = Path(path).resolve()
+    key = compile_key(source)
+    code = find_compiled(source, key)
+    if code != None: return code
+    code = compile_source(str(source))
+    if isinstance(code, FullReturn): return FullReturn()
+    store_compiled(source, key, code)
+    return code
+
+
+# files are compiled on a process pool once at least this many of them need it at the same time
+PARALLEL_COMPILE_MIN = 8
+# None is one worker per core
+compile_workers: int = None
+compile_pool: ProcessPoolExecutor = None
+
+def compile_in_worker(source: str) -> tuple[MendCode, str]:
+    # errors are collected and sent back with the result, so they're shown in file order by the parent
+    diagnostics = CollectOutput()
+    previous = use_output(diagnostics, diagnostics)
+    try: code = compile_source(source)
+    finally: restore_output(previous)
+    return code, diagnostics.getvalue()
+
+
+def get_compile_pool() -> ProcessPoolExecutor:
+    global compile_pool
+    if compile_pool == None: compile_pool = ProcessPoolExecutor(compile_workers)
+    return compile_pool
+
+
+def load_compiled_many(paths: list[str | Path]) -> list[tuple[MendCode, str]]:
+    # -> (code, compile errors) for every path, in the same order; files missing from both caches are compiled in parallel
+    sources = [Path(p).resolve() for p in paths]
+    keys = [compile_key(s) for s in sources]
+    out = [(find_compiled(s, k), '') for s, k in zip(sources, keys)]
+    missing = [i for i, (code, _) in enumerate(out) if code == None]
+    if len(missing) == 0: return out
+
+    names = [str(sources[i]) for i in missing]
+    results = None
+    workers = compile_workers if compile_workers != None else os.cpu_count() or 1
+    if len(missing) >= PARALLEL_COMPILE_MIN and workers > 1 and not use_incremental:
+        try:
+            results = list(get_compile_pool().map(compile_in_worker, names, chunksize=max(1, len(names) // (workers * 4))))
+        except (OSError, BrokenProcessPool): results = None
+    if results == None: results = [compile_in_worker(n) for n in names]
+
+    for i, (code, errors) in zip(missing, results):
+        if not isinstance(code, FullReturn): store_compiled(sources[i], keys[i], code)
+        out[i] = (code, errors)
+    return out
 
-    token_lines = [[t for t in LineLexer(l).lex_to_tokens() if t.type != TT.COMMENT] for l in lines]
 
-    #print(token_lines)
+STDLIB_FOLDER = 'stdlib'
+snapshots: dict[str, tuple[tuple, tuple, str]] = {}
+
+def snapshot_path(folder: Path) -> Path: return Path(folder.parent, CACHE_FOLDER, folder.name + '.mendimg')
+
+
+def snapshot_key(folder: Path) -> tuple:
+    # only files inside the folder are checked, a frozen folder importing files from outside of it has to be frozen again by hand
+    files = []
+    pending = [str(folder)]
+    while len(pending) > 0:
+        with os.scandir(pending.pop()) as entries:
+            for e in entries:
+                if e.is_dir():
+                    if e.name != CACHE_FOLDER: pending.append(e.path)
+                elif e.name.endswith('.mend'):
+                    stat = e.stat()
+                    files.append((e.path, stat.st_mtime_ns, stat.st_size))
+    return (INTERPRETER_VERSION, tuple(sorted(files)))
+
+
+def freeze(folder: str | Path) -> bool:
+    # imports the folder once and stores what it left behind(variables, constants, functions and anything it logged) as a single image
+    folder = Path(folder).resolve()
+    scope = Scope(root_folder=str(folder.parent))
+    output = CollectOutput()
+    previous = use_output(output, context.diagnostics)
+    # every file runs again for the image, even ones that were already imported
+    registry = use_registry(ModuleRegistry())
+    try: failed = isinstance(import_folder(folder, scope), FullReturn)
+    finally:
+        use_registry(registry)
+        restore_output(previous)
+    if failed: return False
+    snapshot = (snapshot_key(folder), scope.export(), output.getvalue())
+    image = snapshot_path(folder)
+    image.parent.mkdir(exist_ok=True)
+    with open(image, 'wb') as f: pickle.dump(snapshot, f, pickle.HIGHEST_PROTOCOL)
+    snapshots[str(folder)] = snapshot
+    return True
+
+
+def load_snapshot(folder: str | Path) -> tuple[tuple, tuple, str]:
+    # -> (key, (vars, consts, funcs), output) of a folder frozen with freeze(), or None when it has no image or the image is stale
+    if not use_compile_cache: return None
+    folder = Path(folder).resolve()
+    key = snapshot_key(folder)
+    cached = snapshots.get(str(folder))
+    if cached != None and cached[0] == key: return cached
+    image = snapshot_path(folder)
+    if not image.exists(): return None
+    try:
+        with open(image, 'rb') as f: cached = pickle.load(f)
+    except Exception: return None
+    if cached[0] != key: return None
+    snapshots[str(folder)] = cached
+    return cached
+
+
+def preload(folder: str | Path) -> int:
+    # compiles every .mend file under the folder ahead of time, returning how many failed to compile
+    files = sorted([f for f in Path(folder).rglob('*.mend') if CACHE_FOLDER not in f.parts])
+    failed = 0
+    for code, errors in load_compiled_many(files):
+        if isinstance(code, FullReturn): failed += 1; context.diagnostics.write(errors)
+    return failed
+
+
+# .mendproj files are '[setting]: [value]' lines, where a value is a string or a list of strings, with '//' and '/* */' comments
+MENDPROJ_PATTERN = re.compile(r'(?P<SPACE>\s+)|(?P<COMMENT>//[^\n]*|/\*.*?\*/)|(?P<STRING>"[^"\n]*")|(?P<PUNCT>[:,\[\]])|(?P<NAME>[A-Za-z_][A-Za-z_0-9]*)|(?P<ILLEGAL>.)', re.S)
+MENDPROJ_SETTINGS = {'name': str, 'projversion': str, 'langversion': str, 'required': list, 'main': str}
+
+def parse_mendproj(text: str) -> dict[str, str | list[str]]:
+    # -> the settings of a project file, or FullReturn
+    toks = []
+    for m in MENDPROJ_PATTERN.finditer(text):
+        kind = m.lastgroup
+        if kind == 'SPACE' or kind == 'COMMENT': continue
+        line = text.count('\n', 0, m.start())
+        if kind == 'ILLEGAL': log_error(f"malformed project file(unexpected '{m.group()}')", line); return FullReturn()
+        toks.append((kind, m.group()[1:-1] if kind == 'STRING' else m.group(), line))
+    settings = {}
+    pos = 0
+    while pos < len(toks):
+        kind, name, line = toks[pos]
+        if kind != 'NAME' or pos + 2 >= len(toks) or toks[pos+1][:2] != ('PUNCT', ':'): log_error(f"malformed project file(expected '[setting]: [value]', but got '{name}')", line); return FullReturn()
+        if name not in MENDPROJ_SETTINGS: log_error(f"unknown project setting '{name}'", line); return FullReturn()
+        if name in settings: log_error(f"project setting '{name}' is given more than once", line); return FullReturn()
+        kind, value, line = toks[pos+2]
+        pos += 3
+        if kind == 'STRING': settings[name] = value
+        elif (kind, value) == ('PUNCT', '['):
+            items = []
+            while pos < len(toks) and toks[pos][:2] != ('PUNCT', ']'):
+                kind, value, line = toks[pos]
+                if kind != 'STRING': log_error(f"malformed project file(expected a string in '{name}', but got '{value}')", line); return FullReturn()
+                items.append(value)
+                pos += 1
+                if pos < len(toks) and toks[pos][:2] == ('PUNCT', ','): pos += 1
+                elif pos < len(toks) and toks[pos][:2] != ('PUNCT', ']'): log_error(f"malformed project file(expected ',' or ']' in '{name}')", toks[pos][2]); return FullReturn()
+            if pos == len(toks): log_error(f"malformed project file(missing ']' to close '{name}')", line); return FullReturn()
+            pos += 1
+            settings[name] = items
+        else: log_error(f"malformed project file(expected a string or a list for '{name}', but got '{value}')", line); return FullReturn()
+        if settings[name].__class__ is not MENDPROJ_SETTINGS[name]: log_error(f"project setting '{name}' has to be a {'list' if MENDPROJ_SETTINGS[name] is list else 'string'}", line); return FullReturn()
+    return settings
+
+
+class MendBundle:
+    # a whole project compiled ahead of time into one file, running it never reads the project's source files
+    def __init__(self, name: str, projversion: str = '', langversion: str = LANG_VERSION):
+        self.version = INTERPRETER_VERSION
+        self.name = name
+        self.projversion = projversion
+        self.langversion = langversion
+        # the compiled files by their path relative to the project's folder, and the compile_key of what they were compiled from
+        self.modules: dict[str, MendCode] = {}
+        self.keys: dict[str, tuple] = {}
+        # folders that are imported whole, as the files in them in the order they run
+        self.folders: dict[str, list[str]] = {}
+        # the import graph, what every module and folder imports
+        self.imports: dict[str, list[str]] = {}
+        self.required: list[str] = []
+        self.main: str = None
+        self.stats: dict[str, int] = {}
+
+
+def bundle_path(project: str | Path) -> Path: return Path(project).with_suffix('.mendb')
+
+
+def bundle_key(path: str) -> str: return Path(os.path.normpath(path)).as_posix()
+
+
+def same_table(code: list[Instr]) -> list[Instr]:
+    # every instruction using the same slots as the code, functions and containers have slots of their own
+    out = []
+    for instr in code:
+        out.append(instr)
+        if instr.op is OP.IF or instr.op is OP.REPEAT:
+            out.extend(same_table(instr.body))
+            if instr.orelse != None: out.extend(same_table(instr.orelse))
+    return out
+
 
-    interpret(token_lines, root_folder=root_folder)
+def static_imports(code: list[Instr], unknown: list[Instr]) -> list[tuple[str, int]]:
+    # -> (path, line) of every import that can be known without running the code, the rest go in unknown
+    # importing a variable counts as long as the only things the variable is ever given are strings
+    instrs = same_table(code)
+    out = []
+    for instr in instrs:
+        if instr.op is OP.FUNC or instr.op is OP.CONTAINER: out.extend(static_imports(instr.body, unknown))
+        if instr.op is not OP.IMPORT: continue
+        tok = instr.operands[0]
+        if tok.__class__ is Token: out.append((tok.value, instr.line)); continue
+        if tok.__class__ is not Slot: unknown.append(instr); continue
+        given = []
+        for i in instrs:
+            target = i.operands[2] if i.op is OP.CALL else i
+            if target == None or target.op not in (OP.MUT, OP.IMMUT, OP.SET, OP.GET): continue
+            if target.operands[0].__class__ is not Slot or target.operands[0].index != tok.index: continue
+            given.append(target.operands[1] if i is target and i.op is not OP.GET else (None, None))
+        if len(given) == 0 or any([kind != 'value' or not isinstance(payload, str) for kind, payload in given]): unknown.append(instr); continue
+        out.extend([(payload, instr.line) for _, payload in given])
+    return out
 
 
-#with open('./repeat_test.mend', 'rt') as f: run(f.read())
\ No newline at end of file
+def build_project(project: str | Path, output: str | Path = None, diagnostics: MendOutput = None) -> MendBundle:
+    # compiles a project and everything it imports into a single bundle('[project].mendb' by default), -> the bundle or FullReturn
+    previous = use_output(None, diagnostics)
+    try: return build_bundle(Path(project).resolve(), Path(output) if output != None else bundle_path(project))
+    finally: restore_output(previous)
+
+
+def build_bundle(project: Path, output: Path) -> MendBundle:
+    # files that haven't changed since the last build are taken from the old bundle as they are, the rest go through the compile cache
+    with open(project, 'rt') as f: settings = parse_mendproj(f.read())
+    if isinstance(settings, FullReturn): return FullReturn()
+    folder = project.parent
+    previous = load_bundle(output) if output.exists() else None
+    if previous == None: previous = MendBundle(project.stem)
+
+    bundle = MendBundle(settings.get('name', project.stem), settings.get('projversion', ''), settings.get('langversion', LANG_VERSION))
+    if bundle.langversion != LANG_VERSION: context.diagnostics.write(f"warning: '{bundle.name}' is for Mend {bundle.langversion}, but this is Mend {LANG_VERSION}\n")
+    bundle.required = settings.get('required', [])
+    main = settings.get('main')
+    compiled = reused = 0
+
+    # (import path, the module importing it or None for the project file), only paths the file system has are followed
+    pending = [(p, None) for p in reversed(bundle.required + ([main] if main != None else []))]
+    while len(pending) > 0:
+        import_path, importer = pending.pop()
+        path = Path(folder, import_path)
+        if not path.exists(): path = Path(folder, import_path + '.mend')
+        if not path.exists():
+            context.diagnostics.write(f"error: '{import_path}'{f' imported by {importer}' if importer != None else ''} doesn't exist\n")
+            return FullReturn()
+        key = bundle_key(os.path.relpath(path, folder))
+        if importer != None: bundle.imports[importer].append(key)
+        elif import_path == main: bundle.main = key
+        if key in bundle.modules or key in bundle.folders: continue
+        bundle.imports[key] = []
+
+        if path.is_dir():
+            if import_path == main and importer == None: context.diagnostics.write(f"error: the project's main file '{main}' is a folder\n"); return FullReturn()
+            files = sorted([f for f in path.iterdir() if f.name.endswith('.mend')], key=lambda f: f.name)
+            bundle.folders[key] = [bundle_key(os.path.relpath(f, folder)) for f in files]
+            pending.extend([(os.path.relpath(f, folder), key) for f in reversed(files)])
+            continue
+
+        source = path.resolve()
+        built = compile_key(source)
+        if previous.keys.get(key) == built: code = previous.modules[key]; reused += 1
+        else:
+            code = load_compiled(source)
+            if isinstance(code, FullReturn): context.diagnostics.write(f"error: could not compile '{key}'\n"); return FullReturn()
+            # the bundle doesn't keep where the project was built
+            warnings = code.warnings
+            code = MendCode(code.instrs, code.table, key, code.name)
+            code.warnings = warnings
+            compiled += 1
+        bundle.modules[key] = code
+        bundle.keys[key] = built
+        unknown = []
+        found = static_imports(code.instrs, unknown)
+        for instr in unknown: context.diagnostics.write(f"warning: the import on line {instr.line+1} of '{key}' depends on what a variable holds when it runs, so it can't be bundled\n")
+        pending.extend([(p, key) for p, _ in reversed(found)])
+
+    bundle.stats = {'modules': len(bundle.modules), 'compiled': compiled, 'reused': reused}
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'wb') as f: pickle.dump(bundle, f, pickle.HIGHEST_PROTOCOL)
+    return bundle
+
+
+def load_bundle(path: str | Path) -> MendBundle:
+    # -> the bundle, or None if it can't be read or was built by a different version of the interpreter
+    try:
+        with open(path, 'rb') as f: bundle = pickle.load(f)
+    except Exception: return None
+    if not isinstance(bundle, MendBundle) or bundle.version != INTERPRETER_VERSION: return None
+    return bundle
+
+
+def import_bundled(import_path: str, scope: Scope, debug: bool = False):
+    # -> TT.ILLEGAL if the bundle doesn't have it
+    bundle = context.bundle
+    key = bundle_key(os.path.join(scope.root_folder, import_path))
+    if key not in bundle.modules and key not in bundle.folders: key += '.mend'
+    if key in bundle.folders: files = bundle.folders[key]
+    elif key in bundle.modules: files = [key]
+    else: return TT.ILLEGAL
+    for f in files:
+        if isinstance(import_mend_file('', f, scope, bundle.modules[f]), FullReturn): return FullReturn()
+        if debug: context.output.write(f"imported '{f}' from the bundle\n")
+
+
+def run_bundle(path: str | Path, output: MendOutput = None, diagnostics: MendOutput = None):
+    # the required modules are imported first, in order, into the scope the main file(if there is one) then runs in
+    previous = use_output(output, diagnostics)
+    outer = context.bundle
+    registry = use_registry(ModuleRegistry(fixed=True))
+    try:
+        bundle = load_bundle(path)
+        if bundle == None: context.diagnostics.write(f"error: '{path}' isn't a bundle built by this version of the interpreter({INTERPRETER_VERSION}), build it again\n"); return FullReturn()
+        context.bundle = bundle
+        main = bundle.modules[bundle.main] if bundle.main != None else None
+        scope = Scope(main.table if main != None else None, source=bundle.main if main != None else bundle.name)
+        for import_path in bundle.required:
+            if isinstance(import_bundled(import_path, scope), FullReturn): return FullReturn()
+        if main != None: return execute(main, scope=scope)
+    finally:
+        context.bundle = outer
+        use_registry(registry)
+        restore_output(previous)
+
+
+class MendProfiler:
+    # while started, the executor reports every line it runs and every frame it pushes or pops, without one it only pays a None check per line
+    def __init__(self):
+        self.lines: dict[tuple[str, int], list] = {}
+        self.functions: dict[str, list] = {}
+        self.imports: dict[str, list] = {}
+        self.stacks: dict[str, float] = {}
+        self.__frames: list[list] = []
+        self.__stack = ''
+        self.__names: dict[str, str] = {}
+        self.__current: tuple[list, str] = None
+        self.__last = 0.0
+
+    def start(self):
+        if context.profiler != None: raise RuntimeError("a MendProfiler is already running")
+        context.profiler = self
+        self.__last = perf_counter()
+        return self
+
+    def stop(self):
+        if context.profiler is not self: return self
+        self.charge(perf_counter())
+        context.profiler = None
+        return self
+
+    def __enter__(self): return self.start()
+
+    def __exit__(self, *_): self.stop()
+
+    def charge(self, now: float):
+        # the time since the last event belongs to whatever line(or frame, before its first line) was running
+        elapsed = now - self.__last
+        self.__last = now
+        if len(self.__frames) > 0: self.__frames[-1][2] += elapsed
+        if self.__current != None:
+            entry, stack = self.__current
+            entry[2] += elapsed
+        else: stack = self.__stack
+        if stack != '': self.stacks[stack] = self.stacks.get(stack, 0.0) + elapsed
+
+    def push(self, label: str, source: str):
+        now = perf_counter()
+        self.charge(now)
+        self.__frames.append([label, now, 0.0, self.__current])
+        self.__stack = ';'.join([f[0] for f in self.__frames])
+        self.__current = None
+
+    def pop(self, table: dict[str, list] = None, key: str = ''):
+        now = perf_counter()
+        self.charge(now)
+        self.__current = None
+        label, start, own, self.__current = self.__frames.pop()
+        self.__stack = ';'.join([f[0] for f in self.__frames])
+        if table != None: self.record(table, key, now - start, own)
+
+    def enter(self, frame):
+        if frame.label == None: return
+        self.push(frame.label if frame.label == '<main>' else f'{frame.label}()', frame.scope.source)
+
+    def leave(self, frame):
+        now = perf_counter()
+        self.charge(now)
+        self.close_line(frame, now)
+        self.__current = None
+        if frame.label == None: return
+        if frame.label == '<main>': self.pop()
+        else: self.pop(self.functions, frame.label)
+
+    def line(self, frame, instr: Instr):
+        now = perf_counter()
+        self.charge(now)
+        self.close_line(frame, now)
+        source = frame.scope.source
+        entry = self.lines.get((source, instr.line))
+        if entry == None: entry = self.lines[(source, instr.line)] = [0, 0.0, 0.0]
+        entry[0] += 1
+        frame.opened = (entry, now)
+        name = self.__names.get(source)
+        if name == None: name = self.__names[source] = Path(source).name
+        self.__current = (entry, f'{self.__stack};{name}:{instr.line+1}')
+
+    def close_line(self, frame, now: float):
+        # a line's cumulative time runs until its frame moves on, so it includes the blocks and calls it started
+        if frame.opened == None: return
+        entry, start = frame.opened
+        entry[1] += now - start
+        frame.opened = None
+
+    def record(self, table: dict[str, list], key: str, took: float, own: float):
+        entry = table.setdefault(key, [0, 0.0, 0.0])
+        entry[0] += 1; entry[1] += took; entry[2] += own
+
+    def collapsed(self) -> str:
+        # one 'frame;frame;line microseconds' row per stack, the input flamegraph.pl and speedscope expect
+        return '\n'.join([f'{stack} {round(own * 1e6)}' for stack, own in sorted(self.stacks.items()) if round(own * 1e6) > 0])
+
+    def table(self, limit: int = 20) -> str:
+        out = []
+        sections = [
+            ('lines', {f'{Path(k[0]).name}:{k[1]+1}': v for k, v in self.lines.items()}),
+            ('functions', self.functions),
+            ('imports', self.imports),
+        ]
+        for title, entries in sections:
+            if len(entries) == 0: continue
+            out.append(f"{title}(sorted by self time):")
+            out.append(f"{'hits':>10} {'cumulative':>12} {'self':>12}  location")
+            for name, (hits, cum, own) in sorted(entries.items(), key=lambda e: e[1][2], reverse=True)[:limit]:
+                out.append(f"{hits:>10} {cum:>11.6f}s {own:>11.6f}s  {name}")
+            out.append('')
+        return '\n'.join(out)
+
+    def write_collapsed(self, path: str | Path):
+        with open(path, 'wt') as f: f.write(self.collapsed() + '\n')
+
+
+
+def run_file(path: str | Path, root_folder: str = '', profile: bool = False, output: MendOutput = None, diagnostics: MendOutput = None, max_steps: int = None, max_call_depth: int = None, max_memory_items: int = None, timeout: float = None):
+    profiler = MendProfiler().start() if profile else None
+    previous = use_output(output, diagnostics)
+    registry = use_registry(ModuleRegistry())
+    limits = make_limits(max_steps, max_call_depth, max_memory_items, timeout)
+    outer = use_limits(limits) if limits != None else None
+    try:
+        code = load_compiled(path)
+        if not isinstance(code, FullReturn): execute(code, root_folder=root_folder)
+    finally:
+        if limits != None: use_limits(outer)
+        use_registry(registry)
+        restore_output(previous)
+        if profiler != None: profiler.stop()
+    return profiler
+
+
+BATCH_EXIT_CODES = {'ok': 0, 'error': 1, 'crashed': 2, 'limited': 3}
+
+def run_captured(path: str | Path, root_folder: str = '', limits: dict[str, Any] = None) -> dict[str, Any]:
+    # runs a file with output and diagnostics of its own, for batch runs, -> what happened to it
+    # limits are make_limits' arguments as a dict, so they can be sent to worker processes
+    output, diagnostics = CollectOutput(), CollectOutput()
+    previous = use_output(output, diagnostics)
+    # and imports of its own, what a file logs doesn't depend on which files ran before it
+    registry = use_registry(ModuleRegistry())
+    limits = make_limits(**limits) if limits != None else None
+    outer = use_limits(limits)
+    status = 'ok'
+    start = perf_counter()
+    try:
+        code = load_compiled(path)
+        if isinstance(code, FullReturn) or isinstance(execute(code, root_folder=root_folder), FullReturn): status = 'limited' if limits != None and limits.exceeded != None else 'error'
+    except Exception as e: status = 'crashed'; diagnostics.write(f"{type(e).__name__}: {e}\n")
+    finally:
+        use_limits(outer)
+        use_registry(registry)
+        restore_output(previous)
+    result = {'path': str(path), 'status': status, 'exit_code': BATCH_EXIT_CODES[status], 'seconds': perf_counter() - start, 'output': output.getvalue(), 'errors': diagnostics.lines()}
+    if limits != None: result['limits'] = limits.report()
+    return result
+
+
+def run(code: str | list[str] | tuple[str], root_folder: str = '', profile: bool = False, output: MendOutput = None, diagnostics: MendOutput = None, max_steps: int = None, max_call_depth: int = None, max_memory_items: int = None, timeout: float = None):
+    # with any of the limits, going over it stops the run with an error and a report of how far it got
+    token_lines = lex_file(code if isinstance(code, str) else '\n'.join(code))
+
+    #print(token_lines)
+
+    profiler = MendProfiler().start() if profile else None
+    limits = make_limits(max_steps, max_call_depth, max_memory_items, timeout)
+    outer = use_limits(limits) if limits != None else None
+    try: interpret(token_lines, root_folder=root_folder, output=output, diagnostics=diagnostics)
+    finally:
+        if limits != None: use_limits(outer)
+        if profiler != None: profiler.stop()
+    return profiler
+
+
+class Interpreter:
+    # a base environment that's set up once(imports, shared declarations), with every script then run in a child scope on top of it
+    def __init__(self, root_folder: str = '', output: MendOutput = None, diagnostics: MendOutput = None):
+        self.root_folder = root_folder
+        self.output = output
+        self.diagnostics = diagnostics
+        self.base = Scope(root_folder=root_folder)
+        # a module imported by anything this interpreter runs only runs once, until it's reloaded
+        self.registry = ModuleRegistry()
+
+    def compile(self, code: str | list[str] | tuple[str] | MendCode, source: str = '<string>') -> MendCode:
+        if isinstance(code, MendCode): return code
+        return compile_code(lex_file(code if isinstance(code, str) else '\n'.join(code)), source=source)
+
+    def load(self, code: str | list[str] | tuple[str] | MendCode) -> bool:
+        # runs the code like an imported file, keeping whatever it declares in the base environment
+        previous = use_output(self.output, self.diagnostics)
+        registry = use_registry(self.registry)
+        try:
+            code = self.compile(code)
+            if isinstance(code, FullReturn): return False
+            imported = execute(code, isimported=True, root_folder=self.root_folder)
+            if isinstance(imported, FullReturn): return False
+            self.base.merge(*imported)
+            return True
+        finally:
+            use_registry(registry)
+            restore_output(previous)
+
+    def import_path(self, path: str) -> bool:
+        # the same as an 'import' statement in the base environment, so folders and frozen snapshots work too
+        previous = use_output(self.output, self.diagnostics)
+        registry = use_registry(self.registry)
+        try: return not isinstance(run_import(Instr(OP.IMPORT, [Token(TT.STRING, path)], 0), self.base), FullReturn)
+        finally:
+            use_registry(registry)
+            restore_output(previous)
+
+    def reload(self, path: str | Path) -> int:
+        # the module(and everything that imported it) runs again the next time this interpreter imports it, -> how many modules that was
+        return self.registry.forget(Path(self.root_folder, path))
+
+    def fork(self, code: MendCode) -> Scope:
+        # only the names the code uses are looked up in the base, and functions are shared until the child declares its own
+        base = self.base
+        scope = Scope(code.table, self.root_folder, code.source, base.funcs)
+        for name, index in code.table.names.items():
+            base_index = base.table.names.get(name)
+            if base_index == None: continue
+            value = base.slots[base_index]
+            scope.slots[index] = value.copy() if value.__class__ is MendContainer else value
+            if base_index in base.immut: scope.immut.add(index)
+        return scope
+
+    def execute(self, code: str | list[str] | tuple[str] | MendCode, output: MendOutput = None, diagnostics: MendOutput = None, limits: RunLimits = None) -> Scope:
+        # -> the child scope the code ran in, or FullReturn; the base environment is never changed
+        previous = use_output(output if output != None else self.output, diagnostics if diagnostics != None else self.diagnostics)
+        registry = use_registry(self.registry)
+        outer = use_limits(limits) if limits != None else None
+        try:
+            code = self.compile(code)
+            if isinstance(code, FullReturn): return FullReturn()
+            scope = self.fork(code)
+            if isinstance(execute(code, root_folder=self.root_folder, scope=scope), FullReturn): return FullReturn()
+            return scope
+        finally:
+            if limits != None: use_limits(outer)
+            use_registry(registry)
+            restore_output(previous)
+
+
+class InterpreterPool:
+    # hands out warmed interpreters so a request doesn't pay for setting up the base environment, setup(interpreter) runs once per interpreter
+    # safe to use from many threads, an interpreter only goes to one thread at a time and each thread's runs have their own output, imports and limits
+    def __init__(self, setup: Any = None, size: int = 4, root_folder: str = ''):
+        self.setup = setup
+        self.size = size
+        self.root_folder = root_folder
+        self.__idle: list[Interpreter] = []
+        self.__created = 0
+        self.__lock = threading.Condition()
+
+    def acquire(self) -> Interpreter:
+        with self.__lock:
+            while len(self.__idle) == 0 and self.__created >= self.size: self.__lock.wait()
+            if len(self.__idle) > 0: return self.__idle.pop()
+            self.__created += 1
+        interpreter = Interpreter(self.root_folder)
+        if self.setup != None: self.setup(interpreter)
+        return interpreter
+
+    def release(self, interpreter: Interpreter):
+        with self.__lock:
+            self.__idle.append(interpreter)
+            self.__lock.notify()
+
+    @contextmanager
+    def interpreter(self):
+        interpreter = self.acquire()
+        try: yield interpreter
+        finally: self.release(interpreter)
+
+    def execute(self, code: str | list[str] | tuple[str] | MendCode, output: MendOutput = None, diagnostics: MendOutput = None, limits: RunLimits = None) -> Scope:
+        with self.interpreter() as interpreter: return interpreter.execute(code, output, diagnostics, limits)
+
+
+
+#with open('./repeat_test.mend', 'rt') as f: run(f.read())
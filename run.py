@@ -1,5 +1,12 @@
-from pymend import run
+from pymend import run_file, run_captured, preload, freeze, load_snapshot, load_compiled_many, build_project, bundle_path, run_bundle, FullReturn, STDLIB_FOLDER, CACHE_FOLDER, BufferedOutput
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter, sleep
+import pymend
 from pathlib import Path
+import argparse
+import glob
+import json
+import sys
 import os
 
 
@@ -18,6 +25,14 @@ if os.path.exists('./searchfolder.txt'):
         del sff
 
 
+# a frozen stdlib is read once here instead of being imported from source by every script
+if os.path.isdir(os.path.join(searchfolder, STDLIB_FOLDER)): load_snapshot(os.path.join(searchfolder, STDLIB_FOLDER))
+
+
+# the REPL writes through so long running scripts show their output as it happens
+interactive_output = BufferedOutput(flush_policy='line')
+
+
 def cli():
     print("Python Mend Interpreter")
     while True:
@@ -26,18 +41,158 @@ def cli():
         elif inp == 'help':
             print("\n'exit/quit': exits the program\n" +
                   "'help': print this message\n" +
-                  "'run [path]': runs the given file"# +
+                  "'run [path]': runs the given file\n" +
+                  "'profile [path]': runs the given file and prints where the time went, also writing it to '[file name].folded' for flamegraph tools\n" +
+                  "'preload [folder]': compiles every file in the folder(the searchfolder by default) ahead of time\n" +
+                  "'freeze [folder]': snapshots what importing the folder(stdlib by default) leaves behind, so later imports of it load the snapshot instead\n" +
+                  "'watch [path]': runs the given file again every time it or a file it imports changes, until ctrl+c\n" +
+                  "'optimized': turns printing every program after it's optimized on or off"# +
                   #"'code [code]': runs the given code"
                   )
         elif inp.startswith('run '):
             file = Path(searchfolder, inp.removeprefix('run ').removesuffix(".mend") + ".mend")
             if not file.exists(): print(f"path '{file}' does not exist"); continue
-            with open(file, 'rt') as f: content = f.read()
-            run(content, searchfolder)
+            run_file(file, searchfolder, output=interactive_output)
+        elif inp.startswith('profile '):
+            file = Path(searchfolder, inp.removeprefix('profile ').removesuffix(".mend") + ".mend")
+            if not file.exists(): print(f"path '{file}' does not exist"); continue
+            profiler = run_file(file, searchfolder, profile=True, output=interactive_output)
+            print(profiler.table())
+            profiler.write_collapsed(file.stem + '.folded')
+            print(f"collapsed stacks written to '{file.stem}.folded'")
+        elif inp == 'preload' or inp.startswith('preload '):
+            folder = Path(searchfolder, inp.removeprefix('preload').strip())
+            if not folder.is_dir(): print(f"folder '{folder}' does not exist"); continue
+            failed = preload(folder)
+            print(f"preloaded '{folder}'" + (f", {failed} file(s) failed to compile" if failed > 0 else ''))
+        elif inp.startswith('watch '):
+            file = Path(searchfolder, inp.removeprefix('watch ').removesuffix(".mend") + ".mend")
+            if not file.exists(): print(f"path '{file}' does not exist"); continue
+            watch(file)
+        elif inp == 'freeze' or inp.startswith('freeze '):
+            folder = Path(searchfolder, inp.removeprefix('freeze').strip() or STDLIB_FOLDER)
+            if not folder.is_dir(): print(f"folder '{folder}' does not exist"); continue
+            if freeze(folder): print(f"froze '{folder}'")
+            else: print(f"could not freeze '{folder}'")
+        elif inp == 'optimized':
+            pymend.print_optimized = not pymend.print_optimized
+            print(f"printing optimized programs: {'on' if pymend.print_optimized else 'off'}")
         #elif inp.startswith('code '):
         #    run(inp.removeprefix('code '))
 
 
 
+def file_stamps(files: list[str]) -> dict[str, tuple[int, int]]:
+    stamps = {}
+    for f in files:
+        try: stat = os.stat(f); stamps[f] = (stat.st_mtime_ns, stat.st_size)
+        except OSError: stamps[f] = None
+    return stamps
+
+
+def watch(file: Path, interval: float = 0.2):
+    # every file the run loaded is watched, and while watching they're recompiled incrementally
+    pymend.use_incremental = True
+    print(f"watching '{file}', press ctrl+c to stop")
+    try:
+        while True:
+            for f in pymend.incremental_files.values(): f.stats = {}
+            start = perf_counter()
+            run_file(file, searchfolder, output=interactive_output)
+            took = perf_counter() - start
+            updated = [f.stats for f in pymend.incremental_files.values() if len(f.stats) > 0]
+            relexed = sum([s['relexed_lines'] for s in updated])
+            recompiled = sum([s.get('compiled_blocks', 0) for s in updated])
+            print(f"-- ran in {took * 1000:.1f}ms, re-lexed {relexed} line(s) and recompiled {recompiled} block(s) in {len(updated)} file(s), waiting for changes")
+            files = [str(file.resolve())] + [f for f in pymend.compiled_files if f != str(file.resolve())]
+            stamps = file_stamps(files)
+            while file_stamps(files) == stamps: sleep(interval)
+    except KeyboardInterrupt: print("stopped watching")
+    finally: pymend.use_incremental = False
+
+
+def find_batch_files(target: str) -> list[Path]:
+    # a folder runs every .mend file in it, anything else is a glob pattern, both relative to the searchfolder unless they're absolute
+    folder = Path(searchfolder, target)
+    # glob.glob takes absolute patterns too, and just finds nothing for the ones pathlib would raise on(or a searchfolder that isn't there)
+    found = folder.glob('*.mend') if folder.is_dir() else map(Path, glob.glob(str(folder), recursive=True))
+    return sorted([f for f in found if f.is_file() and f.suffix == '.mend' and CACHE_FOLDER not in f.parts])
+
+
+def init_batch_worker(root_folder: str):
+    # forked workers already have the parent's caches in memory, spawned ones read the stdlib snapshot and the .mendc files from disk
+    stdlib = os.path.join(root_folder, STDLIB_FOLDER)
+    if os.path.isdir(stdlib): load_snapshot(stdlib)
+
+
+def batch(target: str, jobs: int = None, summary_path: str = 'batch_summary.json', quiet: bool = False, limits: dict = None) -> int:
+    # limits applies to every file on its own, a file that goes over one is 'limited' and the rest still run
+    files = find_batch_files(target)
+    if len(files) == 0: print(f"no .mend files found for '{target}'"); return 1
+    jobs = jobs if jobs != None else os.cpu_count() or 1
+    start = perf_counter()
+
+    # everything under the searchfolder is compiled once up front, so no worker compiles a shared import itself
+    load_compiled_many(sorted([f for f in Path(searchfolder).rglob('*.mend') if CACHE_FOLDER not in f.parts]))
+
+    results = []
+    if jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(min(jobs, len(files)), initializer=init_batch_worker, initargs=(searchfolder,)) as pool:
+            for result in pool.map(run_captured, files, [searchfolder] * len(files), [limits] * len(files)):
+                results.append(result)
+                if not quiet: print(f"{result['status']:>8} {result['seconds']:>9.4f}s  {result['path']}")
+    else:
+        for f in files:
+            result = run_captured(f, searchfolder, limits)
+            results.append(result)
+            if not quiet: print(f"{result['status']:>8} {result['seconds']:>9.4f}s  {result['path']}")
+
+    failed = [r for r in results if r['status'] != 'ok']
+    summary = {'target': target, 'jobs': jobs, 'files': len(results), 'failed': len(failed), 'seconds': perf_counter() - start, 'results': results}
+    with open(summary_path, 'wt') as f: json.dump(summary, f, indent=4)
+    print(f"{len(results) - len(failed)}/{len(results)} ok in {summary['seconds']:.3f}s, summary written to '{summary_path}'")
+    for r in failed:
+        print(f"{r['path']}:")
+        for e in r['errors']: print(f"    {e}")
+    return 0 if len(failed) == 0 else 1
+
+
+def build(project: str, output: str = None) -> int:
+    if not Path(project).is_file(): print(f"project file '{project}' does not exist"); return 1
+    output = Path(output) if output != None else bundle_path(project)
+    start = perf_counter()
+    bundle = build_project(project, output)
+    if isinstance(bundle, FullReturn): print(f"could not build '{project}'"); return 1
+    stats = bundle.stats
+    print(f"built '{bundle.name}' {bundle.projversion} into '{output}' in {(perf_counter() - start) * 1000:.1f}ms: {stats['modules']} module(s), {stats['compiled']} compiled and {stats['reused']} unchanged")
+    return 0
+
+
+def command_cli(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog='run.py', description="Python Mend Interpreter, starts the REPL when given no arguments")
+    commands = parser.add_subparsers(dest='command', required=True)
+    batch_parser = commands.add_parser('batch', help="run many files at once, each with its own output")
+    batch_parser.add_argument('target', help="a folder or a glob pattern, relative to the searchfolder unless it's absolute")
+    batch_parser.add_argument('--jobs', '-j', type=int, default=None, help="worker processes(one per core by default)")
+    batch_parser.add_argument('--summary', default='batch_summary.json', help="where to write the JSON summary")
+    batch_parser.add_argument('--quiet', '-q', action='store_true', help="only print the totals and the failures")
+    batch_parser.add_argument('--max-steps', type=int, default=None, help="instructions each file can run")
+    batch_parser.add_argument('--max-call-depth', type=int, default=None, help="nested function calls each file can make")
+    batch_parser.add_argument('--max-memory-items', type=int, default=None, help="values(and the items in strings and lists) each file can hold at once")
+    batch_parser.add_argument('--timeout', type=float, default=None, help="seconds each file can run for")
+    build_parser = commands.add_parser('build', help="compile a .mendproj project and everything it imports into one bundle")
+    build_parser.add_argument('project', help="the .mendproj file")
+    build_parser.add_argument('--output', '-o', default=None, help="where to write the bundle('[project].mendb' by default)")
+    exec_parser = commands.add_parser('exec', help="run a bundle made with 'build', without reading any source files")
+    exec_parser.add_argument('bundle', help="the .mendb file")
+    args = parser.parse_args(argv)
+    if args.command == 'build': return build(args.project, args.output)
+    if args.command == 'exec': return 1 if isinstance(run_bundle(args.bundle), FullReturn) else 0
+    limits = {'max_steps': args.max_steps, 'max_call_depth': args.max_call_depth, 'max_memory_items': args.max_memory_items, 'timeout': args.timeout}
+    return batch(args.target, args.jobs, args.summary, args.quiet, limits if any(v != None for v in limits.values()) else None)
+
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1: sys.exit(command_cli(sys.argv[1:]))
     cli()
\ No newline at end of file
@@ -0,0 +1,282 @@
+from pymend import Scope, Frame, MendCode, MendOutput, ModuleRegistry, FullReturn, Suspended, TT, BLOCK_OPENERS, lex_file, compile_lines, optimize, istoken, use_output, use_registry, restore_output, log_warning
+from time import monotonic
+import pymend
+import argparse
+import asyncio
+import sys
+
+
+
+# one line of text each way. the server sends 'ready' when it wants code, 'more' while a block is still open,
+# 'input [prompt]' when a 'get' is waiting, 'out [text]' and 'err [text]' for what Mend logs, and 'bye [reason]' before closing.
+# anything the client sends is a line of Mend, or the answer to a 'get' after 'input'
+
+DEFAULT_PORT = 7141
+
+
+class SessionOutput(MendOutput):
+    # sends what Mend writes back over the connection a line at a time, tagged so the client can tell output and errors apart
+    def __init__(self, writer: asyncio.StreamWriter, tag: str):
+        self.__writer = writer
+        self.__tag = tag
+        self.__partial = ''
+        self.sent = 0
+
+    def write(self, text: str):
+        lines = (self.__partial + text).split('\n')
+        self.__partial = lines.pop()
+        for l in lines: self.send(l)
+
+    def flush(self):
+        if self.__partial != '': self.send(self.__partial); self.__partial = ''
+
+    def send(self, line: str):
+        if self.__writer.is_closing(): return
+        data = f'{self.__tag} {line}\n'.encode()
+        self.sent += len(data)
+        self.__writer.write(data)
+
+
+class Session:
+    # one connection: its own scope that lives across everything it runs, and the run it's in the middle of(if any)
+    def __init__(self, number: int, root_folder: str, writer: asyncio.StreamWriter):
+        self.number = number
+        self.writer = writer
+        self.scope = Scope(root_folder=root_folder, source=f'<session {number}>')
+        self.output = SessionOutput(writer, 'out')
+        self.diagnostics = SessionOutput(writer, 'err')
+        # what the session imports runs once for the whole session, and never for anyone else's
+        self.registry = ModuleRegistry()
+        self.stack: list[Frame] = []
+        self.lines: list[str] = []
+        self.depth = 0
+        self.answer: str = None
+        self.last_active = monotonic()
+        self.running = False
+        self.task: asyncio.Task = None
+
+    def take_input(self, prompt: str) -> str:
+        answer, self.answer = self.answer, None
+        return answer
+
+    def add_line(self, line: str) -> bool:
+        # -> whether the lines so far make up whole statements(every block they open is closed) and can run
+        self.lines.append(line)
+        toks = lex_file(line)[0]
+        if len(toks) > 0 and istoken(toks[0], TT.KEYWORD):
+            if toks[0].value in BLOCK_OPENERS: self.depth += 1
+            elif toks[0].value == 'end' and self.depth > 0: self.depth -= 1
+        return self.depth == 0
+
+    def start(self) -> bool:
+        text = '\n'.join(self.lines)
+        self.lines = []
+        previous = use_output(self.output, self.diagnostics)
+        try:
+            # the names so far keep their slots, but nothing earlier counts as a constant, it might never have been declared
+            table = self.scope.table.copy()
+            table.consts = {}
+            table.immut = set(self.scope.immut)
+            instrs = compile_lines(lex_file(text), table=table)
+            if isinstance(instrs, FullReturn): return False
+            code = MendCode(instrs, table, self.scope.source)
+            if pymend.optimize_code: code = optimize(code)
+            for line, details in code.warnings: log_warning(details, line)
+        finally: restore_output(previous)
+        self.scope.adopt(code.table)
+        self.stack = [Frame(code.instrs, self.scope, 'root')]
+        return True
+
+    def step(self, budget: int):
+        # Mend's output and input belong to the thread, so they're pointed at this session only while it runs
+        previous = use_output(self.output, self.diagnostics)
+        registry = use_registry(self.registry)
+        source = pymend.context.input_source
+        pymend.context.input_source = self.take_input
+        try: return pymend.run_frames(self.stack, budget)
+        finally:
+            pymend.context.input_source = source
+            use_registry(registry)
+            restore_output(previous)
+
+
+class MendServer:
+    # many sessions on one event loop, each runs for at most 'budget' frames and repeat iterations before the others get a turn
+    def __init__(self, root_folder: str = '', budget: int = 1000, idle_timeout: float = 300.0, max_sessions: int = 512):
+        self.root_folder = root_folder
+        self.budget = budget
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.sessions: dict[int, Session] = {}
+        self.started = 0
+        self.evicted = 0
+
+    async def start(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT, socket_path: str = None) -> asyncio.AbstractServer:
+        # a big backlog, so a burst of users connecting at once doesn't get refused
+        if socket_path != None: return await asyncio.start_unix_server(self.handle, socket_path, backlog=self.max_sessions)
+        return await asyncio.start_server(self.handle, host, port, backlog=self.max_sessions)
+
+    def make_room(self) -> bool:
+        if len(self.sessions) < self.max_sessions: return True
+        # the session that has been waiting on its client the longest goes, one that's running never does
+        idle = [s for s in self.sessions.values() if not s.running]
+        if len(idle) == 0: return False
+        self.evict(min(idle, key=lambda s: s.last_active), 'evicted to make room')
+        return True
+
+    def evict(self, session: Session, reason: str):
+        self.sessions.pop(session.number, None)
+        self.evicted += 1
+        if not session.writer.is_closing(): session.writer.write(f'bye {reason}\n'.encode())
+        if session.task != None and session.task is not asyncio.current_task(): session.task.cancel()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if not self.make_room(): writer.write(b'bye server full\n'); await self.close(writer); return
+        self.started += 1
+        session = Session(self.started, self.root_folder, writer)
+        session.task = asyncio.current_task()
+        self.sessions[session.number] = session
+        try:
+            writer.write(b'ready\n')
+            while True:
+                line = await self.read_line(session, reader)
+                if line == None: break
+                if not session.add_line(line): writer.write(b'more\n'); continue
+                if session.start() and not await self.run(session, reader): break
+                writer.write(b'ready\n')
+                await writer.drain()
+        except (asyncio.CancelledError, ConnectionError): pass
+        finally:
+            self.sessions.pop(session.number, None)
+            await self.close(writer)
+
+    async def read_line(self, session: Session, reader: asyncio.StreamReader) -> str:
+        # -> the next line from the client, or None once it's gone or has been idle for too long
+        try: data = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+        except asyncio.TimeoutError: self.evict(session, 'idle'); return None
+        if data == b'': return None
+        session.last_active = monotonic()
+        return data.decode(errors='replace').rstrip('\r\n')
+
+    async def run(self, session: Session, reader: asyncio.StreamReader) -> bool:
+        # -> False if the client went away while its code was running
+        session.running = True
+        try:
+            while True:
+                result = session.step(self.budget)
+                # backpressure, a session whose client isn't reading its output doesn't get to make more of it
+                await session.writer.drain()
+                if result.__class__ is not Suspended: break
+                if result.reason == 'input':
+                    session.writer.write(b'input give input\n')
+                    session.running = False
+                    answer = await self.read_line(session, reader)
+                    if answer == None: return False
+                    session.running = True
+                    session.answer = answer
+                else: await asyncio.sleep(0)
+        finally:
+            session.running = False
+            session.stack = []
+        return True
+
+    async def close(self, writer: asyncio.StreamWriter):
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except (ConnectionError, asyncio.CancelledError): pass
+
+    def stats(self) -> dict[str, int]: return {'sessions': len(self.sessions), 'started': self.started, 'evicted': self.evicted}
+
+
+class LocalClient:
+    # a stand-in for a real client, enough to use a server by hand or to test one
+    def __init__(self):
+        self.reader: asyncio.StreamReader = None
+        self.writer: asyncio.StreamWriter = None
+
+    async def connect(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT, socket_path: str = None) -> tuple[str, str]:
+        if socket_path != None: self.reader, self.writer = await asyncio.open_unix_connection(socket_path)
+        else: self.reader, self.writer = await asyncio.open_connection(host, port)
+        return await self.receive()
+
+    async def send(self, line: str):
+        self.writer.write(line.encode() + b'\n')
+        await self.writer.drain()
+
+    async def receive(self) -> tuple[str, str]:
+        # -> (tag, text), ('bye', 'closed') if the server hung up
+        data = await self.reader.readline()
+        if data == b'': return 'bye', 'closed'
+        tag, _, text = data.decode().rstrip('\n').partition(' ')
+        return tag, text
+
+    async def run(self, source: str, inputs: list[str] = []) -> list[tuple[str, str]]:
+        # sends the source a line at a time, answering every 'get' with the next of the inputs, -> everything that came back besides 'more' and 'ready'
+        inputs = list(inputs)
+        out = []
+        for line in source.split('\n'):
+            await self.send(line)
+            while True:
+                tag, text = await self.receive()
+                if tag in ('more', 'ready'): break
+                if tag == 'input':
+                    if len(inputs) == 0: out.append((tag, text)); return out
+                    await self.send(inputs.pop(0))
+                    continue
+                out.append((tag, text))
+                if tag == 'bye': return out
+        return out
+
+    async def close(self):
+        self.writer.close()
+        try: await self.writer.wait_closed()
+        except ConnectionError: pass
+
+
+async def serve(args) -> int:
+    server = MendServer(args.root, args.budget, args.idle_timeout, args.max_sessions)
+    listening = await server.start(args.host, args.port, args.socket)
+    print(f"serving Mend sessions on {args.socket if args.socket != None else f'{args.host}:{args.port}'}")
+    async with listening: await listening.serve_forever()
+    return 0
+
+
+async def client(args) -> int:
+    connection = LocalClient()
+    tag, text = await connection.connect(args.host, args.port, args.socket)
+    loop = asyncio.get_running_loop()
+    while tag != 'bye':
+        if tag in ('ready', 'more', 'input'):
+            line = await loop.run_in_executor(None, input, {'ready': '> ', 'more': '. ', 'input': f'{text}: '}[tag])
+            await connection.send(line)
+        elif tag == 'err': print(text, file=sys.stderr)
+        else: print(text)
+        tag, text = await connection.receive()
+    print(f"server closed the session({text})")
+    await connection.close()
+    return 0
+
+
+def cli(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog='server.py', description="runs many interactive Mend sessions in one process")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, help in (('serve', "start the server"), ('client', "connect to a server and use it from the terminal")):
+        command = commands.add_parser(name, help=help)
+        command.add_argument('--host', default='127.0.0.1')
+        command.add_argument('--port', type=int, default=DEFAULT_PORT)
+        command.add_argument('--socket', default=None, help="a Unix socket to use instead of TCP")
+        if name == 'serve':
+            command.add_argument('--root', default='', help="the folder imports are relative to")
+            command.add_argument('--budget', type=int, default=1000, help="frames and repeat iterations a session runs before the others get a turn")
+            command.add_argument('--idle-timeout', type=float, default=300.0, help="seconds a session can go without sending anything before it's closed")
+            command.add_argument('--max-sessions', type=int, default=512, help="sessions at once, past this the longest idle one is closed")
+    args = parser.parse_args(argv)
+    try: return asyncio.run(serve(args) if args.command == 'serve' else client(args))
+    except KeyboardInterrupt: return 0
+
+
+
+if __name__ == "__main__":
+    sys.exit(cli(sys.argv[1:]))